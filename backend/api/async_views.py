@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from asgiref.sync import sync_to_async
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_VIEW_WORKERS,
+    thread_name_prefix='async-view'
+)
+
+
+def call_view(view, request, *args, **kwargs):
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if not response.streaming and callable(
+            getattr(response, 'render', None)
+        ):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        run = sync_to_async(
+            call_view, thread_sensitive=False, executor=executor
+        )
+        return await run(view, request, *args, **kwargs)
+
+    return wrapper
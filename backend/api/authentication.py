@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    @property
+    def shared(self):
+        if settings.SHARED_CACHE_ALIAS is None:
+            return None
+        return caches[settings.SHARED_CACHE_ALIAS]
+
+    def cache_key(self, key):
+        return f'auth-token:{key}'
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    return entry[0]
+                del self.entries[key]
+        shared = self.shared
+        if shared is None:
+            return None
+        user = shared.get(self.cache_key(key))
+        if user is not None:
+            self.set_local(key, user)
+        return user
+
+    def set_local(self, key, user):
+        with self.lock:
+            self.entries[key] = (
+                user, time.monotonic() + settings.TOKEN_LOCAL_CACHE_TTL
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.TOKEN_LOCAL_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def set(self, key, user):
+        self.set_local(key, user)
+        shared = self.shared
+        if shared is not None:
+            shared.set(self.cache_key(key), user, settings.TOKEN_CACHE_TTL)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self.cache_key(key))
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return user, token
+        return user, Token(key=key, user=user)
@@ -0,0 +1,180 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from api.serializers import (IngredientRecipeSerializer, RecipeGetSerializer,
+                             ShortRecipeSerializer, SubscriptionsSerializer,
+                             TagSerializer, UserSerializer)
+from foodgram.db.routers import PRIMARY_DATABASE
+from recipe.models import IngredientRecipe, Recipe, TagRecipe
+from rest_framework.fields import (CharField, FileField, IntegerField,
+                                   ReadOnlyField)
+from users.models import User
+
+PASSTHROUGH_FIELDS = (CharField, IntegerField, ReadOnlyField)
+
+
+def file_url(name):
+    return default_storage.url(name) if name else None
+
+
+def get_converter(field):
+    if isinstance(field, FileField):
+        return file_url
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    return field.to_representation
+
+
+def get_field_plan(serializer, prefix=''):
+    return tuple(
+        (name, prefix + field.source.replace('.', '__'), get_converter(field))
+        for name, field in serializer.fields.items()
+        if not field.write_only
+    )
+
+
+def get_columns(plan, computed):
+    return [lookup for name, lookup, _ in plan if name not in computed]
+
+
+def build_row(plan, row, computed):
+    data = {}
+    for name, lookup, convert in plan:
+        if name in computed:
+            data[name] = computed[name]
+            continue
+        value = row[lookup]
+        if convert is not None and value is not None:
+            value = convert(value)
+        data[name] = value
+    return data
+
+
+@lru_cache(maxsize=None)
+def get_plans():
+    return {
+        'recipe': get_field_plan(RecipeGetSerializer()),
+        'tag': get_field_plan(TagSerializer(), 'tag__'),
+        'author': get_field_plan(UserSerializer()),
+        'ingredient': get_field_plan(IngredientRecipeSerializer()),
+        'short_recipe': get_field_plan(ShortRecipeSerializer()),
+        'subscription': get_field_plan(SubscriptionsSerializer()),
+    }
+
+
+RECIPE_COMPUTED = {
+    'tags': None,
+    'author': None,
+    'ingredients': None,
+    'is_favorited': False,
+    'is_in_shopping_cart': False,
+}
+AUTHOR_COMPUTED = {'is_subscribed': False}
+
+
+def build_recipe_fragments(recipe_ids):
+    plans = get_plans()
+    recipes = list(
+        Recipe.objects
+        .using(PRIMARY_DATABASE)
+        .filter(id__in=recipe_ids)
+        .values('author_id', *get_columns(plans['recipe'], RECIPE_COMPUTED))
+    )
+    authors = {
+        row['id']: build_row(plans['author'], row, AUTHOR_COMPUTED)
+        for row in User.objects.using(PRIMARY_DATABASE).filter(
+            id__in={recipe['author_id'] for recipe in recipes}
+        ).values(*get_columns(plans['author'], AUTHOR_COMPUTED))
+    }
+    tags = defaultdict(list)
+    for row in (
+        TagRecipe.objects
+        .using(PRIMARY_DATABASE)
+        .filter(recipe_id__in=recipe_ids)
+        .values('recipe_id', *get_columns(plans['tag'], ()))
+        .order_by('tag__id')
+    ):
+        tags[row['recipe_id']].append(build_row(plans['tag'], row, {}))
+    ingredients = defaultdict(list)
+    for row in (
+        IngredientRecipe.objects
+        .using(PRIMARY_DATABASE)
+        .filter(recipe_id__in=recipe_ids)
+        .values('recipe_id', *get_columns(plans['ingredient'], ()))
+        .order_by('-id')
+    ):
+        ingredients[row['recipe_id']].append(
+            build_row(plans['ingredient'], row, {})
+        )
+    return {
+        recipe['id']: build_row(plans['recipe'], recipe, {
+            **RECIPE_COMPUTED,
+            'tags': tags[recipe['id']],
+            'author': authors[recipe['author_id']],
+            'ingredients': ingredients[recipe['id']],
+        })
+        for recipe in recipes
+    }
+
+
+def get_author_recipes(author_ids, recipes_limit=None):
+    plan = get_plans()['short_recipe']
+    recipes = Recipe.objects.filter(author__in=author_ids).values(
+        'author_id', 'pub_date', *get_columns(plan, ())
+    )
+    author_recipes = defaultdict(list)
+    if recipes_limit is None:
+        for row in recipes.order_by('-pub_date', '-id'):
+            author_recipes[row['author_id']].append(build_row(plan, row, {}))
+        return author_recipes
+    recipes = recipes.annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('author'),
+            order_by=(F('pub_date').desc(), F('id').desc())
+        )
+    )
+    connection = connections[recipes.db]
+    image_variants = Recipe._meta.get_field('image_variants')
+    sql, params = recipes.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT * FROM ({sql}) AS recipes '
+            f'WHERE row_number <= %s ORDER BY pub_date DESC, id DESC',
+            (*params, recipes_limit)
+        )
+        columns = [column[0] for column in cursor.description]
+        for values in cursor.fetchall():
+            row = dict(zip(columns, values))
+            row['image_variants'] = image_variants.from_db_value(
+                row['image_variants'], None, connection
+            )
+            author_recipes[row['author_id']].append(build_row(plan, row, {}))
+    return author_recipes
+
+
+def build_subscriptions(follows, recipes_limit=None):
+    if not follows:
+        return []
+    plan = get_plans()['subscription']
+    author_recipes = get_author_recipes(
+        [follow['author__id'] for follow in follows], recipes_limit
+    )
+    return [
+        build_row(plan, follow, {
+            'is_subscribed': True,
+            'recipes': author_recipes[follow['author__id']],
+        })
+        for follow in follows
+    ]
+
+
+def get_subscription_columns():
+    return get_columns(
+        get_plans()['subscription'], ('is_subscribed', 'recipes')
+    )
@@ -1,30 +1,48 @@
-from django_filters.rest_framework import (BooleanFilter, FilterSet,
-                                           ModelChoiceFilter,
+from django_filters.rest_framework import (BooleanFilter, CharFilter,
+                                           FilterSet, ModelChoiceFilter,
                                            ModelMultipleChoiceFilter)
-from recipe.models import Recipe, Tag
-from rest_framework.filters import SearchFilter
+from recipe.fulltext import search_recipes
+from recipe.inverted_index import recipe_ingredient_index
+from recipe.models import Ingredients, Recipe, Tag
+from recipe.tag_masks import filter_by_tags_mask, has_tag_bit
 from users.models import User
 
 
-class IngredientFilter(SearchFilter):
-    search_param = 'name'
-
-
 class RecipeFilter(FilterSet):
     tags = ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug'
+        to_field_name='slug',
+        method='get_tags'
     )
     author = ModelChoiceFilter(
         queryset=User.objects.all(),
     )
     is_in_shopping_cart = BooleanFilter(method='get_is_in_shopping_cart')
     is_favorited = BooleanFilter(method='get_is_favorited')
+    search = CharFilter(method='get_search')
+    ingredients = ModelMultipleChoiceFilter(
+        queryset=Ingredients.objects.all(),
+        method='get_ingredients'
+    )
+    exclude_ingredients = ModelMultipleChoiceFilter(
+        queryset=Ingredients.objects.all(),
+        method='get_ingredients'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_in_shopping_cart', 'is_favorited')
+        fields = (
+            'tags', 'author', 'is_in_shopping_cart', 'is_favorited', 'search',
+            'ingredients', 'exclude_ingredients'
+        )
+
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_ids = [tag.id for tag in value]
+        if all(has_tag_bit(tag_id) for tag_id in tag_ids):
+            return filter_by_tags_mask(queryset, tag_ids)
+        return queryset.filter(tags__in=tag_ids).distinct()
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
@@ -35,3 +53,21 @@ class RecipeFilter(FilterSet):
         if self.request.user.is_authenticated and value:
             return queryset.filter(users_favorites__user=self.request.user)
         return queryset
+
+    def get_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
+
+    def get_ingredients(self, queryset, name, value):
+        if not value:
+            return queryset
+        included = self.form.cleaned_data.get('ingredients')
+        excluded = self.form.cleaned_data.get('exclude_ingredients')
+        if name == 'exclude_ingredients' and included:
+            return queryset
+        return recipe_ingredient_index.filter(
+            queryset,
+            [ingredient.id for ingredient in included or []],
+            [ingredient.id for ingredient in excluded or []]
+        )
@@ -0,0 +1,285 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from uuid import uuid4
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from foodgram.db.pool import get_pool_stats
+
+METRICS_FILE_SUFFIX = '.json'
+POOL_GAUGES = ('size', 'in_use', 'idle')
+
+current_queries = ContextVar('current_queries', default=None)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __enter__(self):
+        self.token = current_queries.set(self)
+        return self
+
+    def __exit__(self, *args):
+        current_queries.reset(self.token)
+
+
+def count_queries(execute, sql, params, many, context):
+    queries = current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.count += 1
+        queries.duration += time.perf_counter() - started
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.flushed_at = 0.0
+        self.filename = None
+        self.pid = None
+
+    def get_path(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.filename = f'{self.pid}-{uuid4().hex}'
+        return os.path.join(
+            settings.METRICS_DIR, self.filename + METRICS_FILE_SUFFIX
+        )
+
+    def new_route(self):
+        return {
+            'requests': 0,
+            'duration_buckets': [0] * len(settings.METRICS_DURATION_BUCKETS),
+            'duration_sum': 0.0,
+            'size_buckets': [0] * len(settings.METRICS_SIZE_BUCKETS),
+            'size_sum': 0,
+            'queries': 0,
+            'query_duration_sum': 0.0,
+        }
+
+    def observe(self, route, method, status, duration, size, queries):
+        key = f'{route}|{method}|{status}'
+        duration_bucket = bisect_left(
+            settings.METRICS_DURATION_BUCKETS, duration
+        )
+        size_bucket = bisect_left(settings.METRICS_SIZE_BUCKETS, size)
+        with self.lock:
+            metrics = self.routes.get(key)
+            if metrics is None:
+                metrics = self.routes[key] = self.new_route()
+            metrics['requests'] += 1
+            if duration_bucket < len(metrics['duration_buckets']):
+                metrics['duration_buckets'][duration_bucket] += 1
+            metrics['duration_sum'] += duration
+            if size_bucket < len(metrics['size_buckets']):
+                metrics['size_buckets'][size_bucket] += 1
+            metrics['size_sum'] += size
+            metrics['queries'] += queries.count
+            metrics['query_duration_sum'] += queries.duration
+            flush = (
+                time.monotonic() - self.flushed_at
+                > settings.METRICS_FLUSH_INTERVAL
+            )
+        if flush:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            data = json.dumps({
+                'routes': self.routes,
+                'pools': get_pool_stats(),
+            })
+            self.flushed_at = time.monotonic()
+        path = self.get_path()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf8') as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    def collect(self):
+        self.flush()
+        routes = {}
+        pools = {}
+        for filename in os.listdir(settings.METRICS_DIR):
+            if not filename.endswith(METRICS_FILE_SUFFIX):
+                continue
+            try:
+                with open(
+                    os.path.join(settings.METRICS_DIR, filename),
+                    encoding='utf8'
+                ) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            merge_metrics(routes, data.get('routes', {}))
+            merge_metrics(pools, get_pool_metrics(
+                data.get('pools', {}), is_alive(get_file_pid(filename))
+            ))
+        return routes, pools
+
+    def render(self):
+        lines = []
+        help_lines = (
+            ('foodgram_http_request_duration_seconds', 'histogram',
+             'Время обработки запроса'),
+            ('foodgram_http_response_size_bytes', 'histogram',
+             'Размер ответа'),
+            ('foodgram_db_queries_total', 'counter',
+             'Число SQL-запросов'),
+            ('foodgram_db_query_duration_seconds_total', 'counter',
+             'Суммарное время SQL-запросов'),
+            ('foodgram_db_pool_size', 'gauge',
+             'Размер пула соединений'),
+            ('foodgram_db_pool_in_use', 'gauge',
+             'Выданные из пула соединения'),
+            ('foodgram_db_pool_idle', 'gauge',
+             'Свободные соединения в пуле'),
+            ('foodgram_db_pool_connections_created_total', 'counter',
+             'Открытые пулом соединения'),
+            ('foodgram_db_pool_recycled_total', 'counter',
+             'Соединения, закрытые по возрасту'),
+            ('foodgram_db_pool_check_failures_total', 'counter',
+             'Соединения, не прошедшие проверку'),
+            ('foodgram_db_pool_waits_total', 'counter',
+             'Ожидания свободного соединения'),
+            ('foodgram_db_pool_wait_seconds_total', 'counter',
+             'Суммарное время ожидания соединения'),
+            ('foodgram_db_pool_timeouts_total', 'counter',
+             'Отказы по таймауту ожидания'),
+        )
+        samples = {name: [] for name, _, _ in help_lines}
+        routes, pools = self.collect()
+        for key, metrics in sorted(routes.items()):
+            route, method, status = key.split('|')
+            labels = f'route="{route}",method="{method}",status="{status}"'
+            for name, buckets, bounds, total in (
+                (
+                    'foodgram_http_request_duration_seconds',
+                    metrics['duration_buckets'],
+                    settings.METRICS_DURATION_BUCKETS,
+                    metrics['duration_sum']
+                ),
+                (
+                    'foodgram_http_response_size_bytes',
+                    metrics['size_buckets'],
+                    settings.METRICS_SIZE_BUCKETS,
+                    metrics['size_sum']
+                ),
+            ):
+                cumulative = 0
+                for bound, count in zip(bounds, buckets):
+                    cumulative += count
+                    samples[name].append(
+                        f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                samples[name].append(
+                    f'{name}_bucket{{{labels},le="+Inf"}} '
+                    f'{metrics["requests"]}'
+                )
+                samples[name].append(f'{name}_sum{{{labels}}} {total}')
+                samples[name].append(
+                    f'{name}_count{{{labels}}} {metrics["requests"]}'
+                )
+            samples['foodgram_db_queries_total'].append(
+                f'foodgram_db_queries_total{{{labels}}} {metrics["queries"]}'
+            )
+            samples['foodgram_db_query_duration_seconds_total'].append(
+                f'foodgram_db_query_duration_seconds_total{{{labels}}} '
+                f'{metrics["query_duration_sum"]}'
+            )
+        for alias, stats in sorted(pools.items()):
+            for name, value in (
+                ('foodgram_db_pool_size', stats['size']),
+                ('foodgram_db_pool_in_use', stats['in_use']),
+                ('foodgram_db_pool_idle', stats['idle']),
+                ('foodgram_db_pool_connections_created_total',
+                 stats['created']),
+                ('foodgram_db_pool_recycled_total', stats['recycled']),
+                ('foodgram_db_pool_check_failures_total',
+                 stats['check_failures']),
+                ('foodgram_db_pool_waits_total', stats['waits']),
+                ('foodgram_db_pool_wait_seconds_total',
+                 stats['wait_seconds']),
+                ('foodgram_db_pool_timeouts_total', stats['timeouts']),
+            ):
+                samples[name].append(f'{name}{{alias="{alias}"}} {value}')
+        for name, metric_type, description in help_lines:
+            if not samples[name] and name.startswith('foodgram_db_pool'):
+                continue
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.extend(samples[name])
+        return '\n'.join(lines) + '\n'
+
+
+def merge_metrics(totals, items):
+    for key, metrics in items.items():
+        total = totals.get(key)
+        if total is None:
+            totals[key] = metrics
+            continue
+        for name, value in metrics.items():
+            if isinstance(value, list):
+                total[name] = [
+                    left + right for left, right in zip(total[name], value)
+                ]
+            else:
+                total[name] += value
+
+
+def get_file_pid(filename):
+    pid = filename.split('-', 1)[0]
+    return int(pid) if pid.isdigit() else None
+
+
+def is_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_pool_metrics(pools, alive):
+    if alive:
+        return pools
+    return {
+        alias: {
+            name: 0 if name in POOL_GAUGES else value
+            for name, value in stats.items()
+        }
+        for alias, stats in pools.items()
+    }
+
+
+registry = MetricsRegistry()
+
+
+def get_route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from django.conf import settings
+
+from api.metrics import QueryCounter, get_route, registry
+from foodgram.db.routers import (get_request_user, pin_to_primary,
+                                 replica_request)
+from rest_framework.permissions import SAFE_METHODS
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with QueryCounter() as queries:
+            response = self.get_response(request)
+        return self.observe(request, response, queries, started)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        with QueryCounter() as queries:
+            response = await self.get_response(request)
+        return self.observe(request, response, queries, started)
+
+    def observe(self, request, response, queries, started):
+        if response.streaming:
+            response.streaming_content = self.observe_stream(
+                request, response.status_code, response.streaming_content,
+                queries, started
+            )
+        else:
+            registry.observe(
+                get_route(request),
+                request.method,
+                response.status_code,
+                time.perf_counter() - started,
+                len(response.content),
+                queries
+            )
+        return response
+
+    def observe_stream(self, request, status, content, queries, started):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            registry.observe(
+                get_route(request),
+                request.method,
+                status,
+                time.perf_counter() - started,
+                size,
+                queries
+            )
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = replica_request.set(self.get_replica_request(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_request.reset(token)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = replica_request.set(self.get_replica_request(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_request.reset(token)
+        self.pin(request, response)
+        return response
+
+    def get_replica_request(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return None
+        return request if request.method in SAFE_METHODS else None
+
+    def pin(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        user = get_request_user(request)
+        if user is not None:
+            pin_to_primary(response, user.id)
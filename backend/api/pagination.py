@@ -1,7 +1,93 @@
+from django.utils.dateparse import parse_datetime
+
 from foodgram.settings import PAGE_SIZE
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, Cursor,
+                                       CursorPagination, PageNumberPagination)
 
 
 class PaginationClass(PageNumberPagination):
     page_size = PAGE_SIZE
     page_size_query_param = "limit"
+
+
+class CursorPaginationClass(CursorPagination):
+    page_size = PAGE_SIZE
+    page_size_query_param = "limit"
+
+
+class KeysetPaginationClass(BasePagination):
+    ordering = None
+    mode_query_param = 'pagination'
+
+    def get_paginator(self, queryset, request):
+        if (
+            CursorPaginationClass.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        ):
+            paginator = CursorPaginationClass()
+            paginator.ordering = (
+                tuple(queryset.query.order_by) or self.ordering
+            )
+            return paginator
+        return PaginationClass()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(queryset, request)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return PaginationClass().get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return data['results']
+
+
+class RecipePaginationClass(KeysetPaginationClass):
+    ordering = ('-pub_date', '-id')
+
+
+class FollowPaginationClass(KeysetPaginationClass):
+    ordering = ('-add_date', '-id')
+
+
+class FeedPaginationClass(CursorPaginationClass):
+    ordering = ('-pub_date', '-id')
+
+    def get_position(self, request):
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            return None
+        pub_date, _, recipe_id = (cursor.position or '').partition('|')
+        try:
+            position = parse_datetime(pub_date), int(recipe_id)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def paginate_keys(self, get_keys, request):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        keys = get_keys(self.get_position(request), self.page_size + 1)
+        self.page = keys[:self.page_size]
+        self.has_next = len(keys) > self.page_size
+        self.has_previous = False
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        pub_date, recipe_id = self.page[-1]
+        return self.encode_cursor(Cursor(
+            offset=0,
+            reverse=False,
+            position=f'{pub_date.isoformat()}|{recipe_id}'
+        ))
@@ -0,0 +1,135 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from api.fast_serializers import build_recipe_fragments
+from api.snapshots import ingredient_snapshot, tag_snapshot
+from foodgram.db.routers import PRIMARY_DATABASE
+from recipe.models import FragmentVersion
+
+recipe_cache = caches[settings.RECIPE_CACHE_ALIAS]
+
+RECIPE_OVERLAY_FIELDS = (
+    'is_favorited', 'is_in_shopping_cart', 'is_subscribed'
+)
+
+
+def recipe_version_key(recipe_id):
+    return f'recipe-version:{recipe_id}'
+
+
+def user_version_key(user_id):
+    return f'user-version:{user_id}'
+
+
+def set_versions(keys):
+    if not keys:
+        return
+    version = time.time_ns()
+    FragmentVersion.objects.bulk_create(
+        [FragmentVersion(key=key, version=version) for key in keys],
+        ignore_conflicts=True
+    )
+    FragmentVersion.objects.filter(key__in=keys).update(version=version)
+
+
+def invalidate_recipes(recipe_ids):
+    set_versions([recipe_version_key(recipe_id) for recipe_id in recipe_ids])
+
+
+def invalidate_recipe(recipe_id):
+    invalidate_recipes([recipe_id])
+
+
+def invalidate_user(user_id):
+    set_versions([user_version_key(user_id)])
+
+
+def read_versions(keys):
+    return dict(
+        FragmentVersion.objects
+        .using(PRIMARY_DATABASE)
+        .filter(key__in=keys)
+        .values_list('key', 'version')
+    )
+
+
+def get_versions(keys):
+    versions = read_versions(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        FragmentVersion.objects.using(PRIMARY_DATABASE).bulk_create(
+            [
+                FragmentVersion(key=key, version=time.time_ns())
+                for key in missing
+            ],
+            ignore_conflicts=True
+        )
+        versions.update(read_versions(missing))
+    return versions
+
+
+def get_fragment_keys(recipes):
+    catalogue_version = (
+        f'{tag_snapshot.get_version()}:{ingredient_snapshot.get_version()}'
+    )
+    versions = get_versions(list(
+        {recipe_version_key(recipe['id']) for recipe in recipes}
+        | {user_version_key(recipe['author_id']) for recipe in recipes}
+    ))
+    return {
+        recipe['id']: (
+            f'recipe:{recipe["id"]}'
+            f':{versions[recipe_version_key(recipe["id"])]}'
+            f':{versions[user_version_key(recipe["author_id"])]}'
+            f':{catalogue_version}'
+        )
+        for recipe in recipes
+    }
+
+
+def get_fragments(recipes):
+    keys = get_fragment_keys(recipes)
+    cached = recipe_cache.get_many(list(keys.values()))
+    fragments = {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items() if key in cached
+    }
+    missing = [
+        recipe['id'] for recipe in recipes if recipe['id'] not in fragments
+    ]
+    if missing:
+        built = build_recipe_fragments(missing)
+        recipe_cache.set_many({
+            keys[recipe_id]: fragment
+            for recipe_id, fragment in built.items()
+        })
+        fragments.update(built)
+    return fragments
+
+
+def apply_overlay(fragment, recipe, request):
+    data = fragment.copy()
+    data['author'] = fragment['author'].copy()
+    if data['image']:
+        data['image'] = request.build_absolute_uri(data['image'])
+    data['image_variants'] = {
+        size: {
+            image_format: request.build_absolute_uri(url)
+            for image_format, url in formats.items()
+        }
+        for size, formats in fragment['image_variants'].items()
+    }
+    data['author']['is_subscribed'] = recipe.get('is_subscribed', False)
+    data['is_favorited'] = recipe.get('is_favorited', False)
+    data['is_in_shopping_cart'] = recipe.get('is_in_shopping_cart', False)
+    return data
+
+
+def get_recipe_representations(recipes, request):
+    fragments = get_fragments(recipes)
+    return [
+        apply_overlay(fragments[recipe['id']], recipe, request)
+        for recipe in recipes
+    ]
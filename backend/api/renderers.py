@@ -0,0 +1,121 @@
+import json
+
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+from django.http import StreamingHttpResponse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATORS = (
+    (b'\xe2\x80\xa8', b'\\u2028'),
+    (b'\xe2\x80\xa9', b'\\u2029'),
+)
+
+
+class FastJSONEncoder(JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, FieldFile):
+            return obj.url if obj else None
+        return super().default(obj)
+
+
+encoder = FastJSONEncoder()
+
+
+def dumps(data):
+    if orjson is not None:
+        body = orjson.dumps(
+            data,
+            default=encoder.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+    else:
+        body = json.dumps(
+            data,
+            cls=FastJSONEncoder,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(',', ':')
+        ).encode()
+    for separator, escaped in LINE_SEPARATORS:
+        if separator in body:
+            body = body.replace(separator, escaped)
+    return body
+
+
+def iter_json(data, chunk_size):
+    if isinstance(data, list):
+        yield b'['
+        for start in range(0, len(data), chunk_size):
+            chunk = dumps(data[start:start + chunk_size])[1:-1]
+            yield chunk if start == 0 else b',' + chunk
+        yield b']'
+    elif isinstance(data, dict) and data:
+        separator = b'{'
+        for key, value in data.items():
+            yield separator + dumps(str(key)) + b':'
+            yield from iter_json(value, chunk_size)
+            separator = b','
+        yield b'}'
+    else:
+        yield dumps(data)
+
+
+def count_items(data):
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        return sum(
+            len(value) for value in data.values() if isinstance(value, list)
+        )
+    return 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ) is not None:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        return dumps(data)
+
+    def render_stream(self, response):
+        streaming = StreamingHttpResponse(
+            iter_json(response.data, settings.JSON_STREAM_CHUNK_SIZE),
+            status=response.status_code,
+            content_type=self.media_type
+        )
+        for header, value in response.items():
+            if header.lower() != 'content-type':
+                streaming[header] = value
+        return streaming
+
+
+class StreamingListMixin:
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        renderer = getattr(response, 'accepted_renderer', None)
+        if (
+            isinstance(response, Response)
+            and type(renderer) is FastJSONRenderer
+            and response.status_code == 200
+            and renderer.get_indent(
+                response.accepted_media_type, response.renderer_context
+            ) is None
+            and count_items(response.data) >= settings.JSON_STREAM_MIN_ITEMS
+        ):
+            return renderer.render_stream(response)
+        return response
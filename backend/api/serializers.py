@@ -1,14 +1,21 @@
 from base64 import b64decode
 
+from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 
 from djoser.serializers import UserSerializer
 from recipe.models import (FavoriteRecipe, IngredientRecipe, Ingredients,
-                           Recipe, ShoppingCart, Tag)
-from rest_framework.serializers import (ImageField, IntegerField,
-                                        ModelSerializer,
+                           Recipe, ShoppingCart, Tag, TagRecipe)
+from recipe.signals import recipe_ingredients_changed
+from recipe.tag_masks import get_tags_mask, has_tag_bit
+from rest_framework.serializers import (Field, ImageField, IntegerField,
+                                        ListField, ModelSerializer,
                                         PrimaryKeyRelatedField, ReadOnlyField,
-                                        SerializerMethodField, ValidationError)
+                                        Serializer, SerializerMethodField,
+                                        ValidationError)
 from users.models import Follow, User
 
 
@@ -22,6 +29,27 @@ class Base64ImageField(ImageField):
         return super().to_internal_value(data)
 
 
+class ImageVariantsField(Field):
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = {}
+        for size in settings.RECIPE_IMAGE_SIZES:
+            if size not in value:
+                continue
+            variants[size] = {}
+            for image_format, name in value[size].items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[size][image_format] = url
+        return variants
+
+
 class IngredientSerializer(ModelSerializer):
     class Meta:
         model = Ingredients
@@ -44,14 +72,23 @@ class IngredientRecipeSerializer(ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RelatedIdsSerializer(Serializer):
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        max_length=settings.BULK_RELATIONS_LIMIT
+    )
+
+
 class ShortRecipeSerializer(ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class AddIngredientSerializer(ModelSerializer):
-    id = PrimaryKeyRelatedField(queryset=Ingredients.objects.all())
+    id = IntegerField()
     amount = IntegerField()
 
     class Meta:
@@ -59,6 +96,46 @@ class AddIngredientSerializer(ModelSerializer):
         fields = ('id', 'amount')
 
 
+class UserSerializer(UserSerializer):
+    is_subscribed = SerializerMethodField(
+        method_name='get_is_subscribed'
+    )
+
+    class Meta:
+        model = User
+        fields = (
+            'id',
+            'username',
+            'password',
+            'email',
+            'first_name',
+            'last_name',
+            'is_subscribed'
+        )
+        extra_kwargs = {'password': {'write_only': True}}
+
+    def create(self, validated_data):
+        user = User(
+            email=validated_data['email'],
+            username=validated_data['username'],
+            first_name=validated_data['first_name'],
+            last_name=validated_data['last_name'],
+        )
+        user.set_password(validated_data['password'])
+        user.save()
+        return user
+
+    def get_is_subscribed(self, obj):
+        request = self.context.get('request')
+        if request is None or request.user.is_anonymous:
+            return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return Follow.objects.filter(
+            user=request.user, author=obj
+        ).exists()
+
+
 class RecipeGetSerializer(ModelSerializer):
     tags = TagSerializer(many=True)
     author = UserSerializer(many=False)
@@ -66,17 +143,20 @@ class RecipeGetSerializer(ModelSerializer):
         many=True,
         source='ingredientrecipes'
     )
+    image_variants = ImageVariantsField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('search_vector', 'tags_mask')
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return (
             request.user.is_authenticated
             and FavoriteRecipe.objects.filter(
@@ -89,6 +169,8 @@ class RecipeGetSerializer(ModelSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return (
             request.user.is_authenticated
             and ShoppingCart.objects.filter(
@@ -118,19 +200,95 @@ class RecipeSerializer(ModelSerializer):
         )
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'author',
+            'tags',
+            Prefetch(
+                'ingredientrecipes',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            )
+        )
         serializer = RecipeGetSerializer(instance)
         return serializer.data
 
-    def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            IngredientRecipe.objects.get_or_create(
-                recipe=recipe,
-                ingredient=ingredient['id'],
-                amount=ingredient['amount']
+    def save_tags(self, recipe, tags, created=False):
+        tag_ids = {tag.id for tag in tags}
+        stored = set() if created else set(
+            TagRecipe.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True
+            )
+        )
+        if stored - tag_ids:
+            TagRecipe.objects.filter(
+                recipe=recipe, tag_id__in=stored - tag_ids
+            ).delete()
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe=recipe, tag_id=tag_id)
+            for tag_id in tag_ids - stored
+        )
+        recipe.tags_mask = get_tags_mask(
+            tag_id for tag_id in tag_ids if has_tag_bit(tag_id)
+        )
+        Recipe.objects.filter(pk=recipe.pk).update(tags_mask=recipe.tags_mask)
+
+    def save_ingredients(self, recipe, ingredients, created=False):
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        stored = {} if created else {
+            ingredient.ingredient_id: ingredient
+            for ingredient in IngredientRecipe.objects.filter(recipe=recipe)
+        }
+        removed = [
+            ingredient.id for ingredient_id, ingredient in stored.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            if ingredient_id in stored and (
+                stored[ingredient_id].amount != amount
+            ):
+                stored[ingredient_id].amount = amount
+                changed.append(stored[ingredient_id])
+        if removed:
+            IngredientRecipe.objects.filter(id__in=removed).delete()
+        IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in stored
+        )
+        recipe_ingredients_changed.send(
+            sender=Recipe,
+            recipe=recipe,
+            ingredient_ids=(
+                (set(stored) ^ set(amounts))
+                | {ingredient.ingredient_id for ingredient in changed}
+            ),
+            added_ids=set(amounts) - set(stored),
+            removed_ids=set(stored) - set(amounts)
+        )
+
+    def validate_ingredients(self, ingredients):
+        ingredient_ids = {ingredient['id'] for ingredient in ingredients}
+        missing = ingredient_ids - set(
+            Ingredients.objects.filter(id__in=ingredient_ids).values_list(
+                'id', flat=True
+            )
+        )
+        if missing:
+            raise ValidationError(
+                'Ингредиенты не найдены: '
+                + ', '.join(str(pk) for pk in sorted(missing))
             )
+        return ingredients
 
     def validate(self, data):
-        ingredients = self.initial_data.get('ingredients')
+        ingredients = self.initial_data.get('ingredients') or []
         ingredients_list = [ingredient['id'] for ingredient in ingredients]
         amount_list = [int(ingredient['amount']) for ingredient in ingredients]
         if len(ingredients_list) != len(set(ingredients_list)):
@@ -144,63 +302,26 @@ class RecipeSerializer(ModelSerializer):
                 )
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
-        recipe.save()
-        self.create_ingredients(ingredients, recipe)
+        self.save_tags(recipe, tags, created=True)
+        self.save_ingredients(recipe, ingredients, created=True)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        instance.ingredients.clear()
-        self.create_ingredients(ingredients, instance)
-        instance.tags.clear()
-        instance.tags.set(tags)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if ingredients is not None:
+            self.save_ingredients(instance, ingredients)
+        if tags is not None:
+            self.save_tags(instance, tags)
         return super().update(instance, validated_data)
 
 
-class UserSerializer(UserSerializer):
-    is_subscribed = SerializerMethodField(
-        method_name='get_is_subscribed'
-    )
-
-    class Meta:
-        model = User
-        fields = (
-            'id',
-            'username',
-            'password',
-            'email',
-            'first_name',
-            'last_name',
-            'is_subscribed'
-        )
-        extra_kwargs = {'password': {'write_only': True}}
-
-    def create(self, validated_data):
-        user = User(
-            email=validated_data['email'],
-            username=validated_data['username'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name'],
-        )
-        user.set_password(validated_data['password'])
-        user.save()
-        return user
-
-    def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return Follow.objects.filter(
-            user=request.user, author=obj
-        ).exists()
-
-
 class SubscriptionsSerializer(ModelSerializer):
     username = ReadOnlyField(source='author.username')
     email = ReadOnlyField(source='author.email')
@@ -210,7 +331,7 @@ class SubscriptionsSerializer(ModelSerializer):
     is_subscribed = SerializerMethodField()
     recipes = SerializerMethodField()
     recipes_count = IntegerField(
-        source='author.recipes.count',
+        source='author.recipes_count',
         read_only=True
     )
 
@@ -223,22 +344,16 @@ class SubscriptionsSerializer(ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(
-            user=obj.user,
-            author=obj.author
-        ).exists()
+        return True
 
     def get_recipes(self, obj):
-        try:
-            recipe_limit = int(
-                self.context.get('request').query_params['recipes_limit']
-            )
-            queryset = Recipe.objects.filter(author=obj.author)[:recipe_limit]
-        except Exception:
-            queryset = Recipe.objects.filter(author=obj.author)
+        queryset = Recipe.objects.filter(
+            author=obj.author
+        ).order_by('-pub_date', '-id')
+        request = self.context.get('request')
+        recipes_limit = request and request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            queryset = queryset[:int(recipes_limit)]
         serializer = ShortRecipeSerializer(queryset, read_only=True, many=True)
 
         return serializer.data
-
-    def get_recipes_count(self, obj):
-        return obj.author.recipes.count()
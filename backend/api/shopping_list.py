@@ -0,0 +1,74 @@
+import csv
+import json
+
+from django.db.models import F
+
+from recipe.models import ShoppingListItem
+
+SHOPPING_LIST_FILENAME = 'cart'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def get_shopping_list(user):
+    return (
+        ShoppingListItem.objects
+        .filter(user=user)
+        .values(
+            'ingredient__id',
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            total_amount=F('amount')
+        )
+        .order_by('ingredient__name')
+    )
+
+
+def render_txt(recipes_count, ingredients):
+    yield (
+        f'Отобрано рецептов: {recipes_count}\n\n'
+        f'Необходимые ингредиенты:\n\n'
+    )
+    for item in ingredients:
+        yield (
+            f'{item["ingredient__name"]} '
+            f'({item["ingredient__measurement_unit"]}) - '
+            f'{item["total_amount"]}\n'
+        )
+
+
+def render_csv(recipes_count, ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for item in ingredients:
+        yield writer.writerow((
+            item['ingredient__name'],
+            item['ingredient__measurement_unit'],
+            item['total_amount'],
+        ))
+
+
+def render_json(recipes_count, ingredients):
+    yield '['
+    separator = ''
+    for item in ingredients:
+        yield separator + json.dumps(
+            {
+                'name': item['ingredient__name'],
+                'measurement_unit': item['ingredient__measurement_unit'],
+                'amount': item['total_amount'],
+            },
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']'
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'json': (render_json, 'application/json; charset=utf-8'),
+}
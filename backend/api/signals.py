@@ -0,0 +1,79 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.authentication import token_cache
+from api.metrics import count_queries
+from api.recipe_cache import (invalidate_recipe, invalidate_recipes,
+                              invalidate_user)
+from api.snapshots import ingredient_snapshot, tag_snapshot
+from recipe.models import (FavoriteRecipe, IngredientRecipe, Ingredients,
+                           Recipe, ShoppingCart, Tag, TagRecipe)
+from recipe.signals import relations_bulk_changed
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_snapshot(sender, **kwargs):
+    tag_snapshot.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Ingredients)
+def invalidate_ingredient_snapshot(sender, **kwargs):
+    ingredient_snapshot.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_fragment(sender, instance, **kwargs):
+    invalidate_recipe(instance.id)
+
+
+@receiver((post_save, post_delete), sender=IngredientRecipe)
+@receiver((post_save, post_delete), sender=TagRecipe)
+@receiver((post_save, post_delete), sender=FavoriteRecipe)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_recipe_relation_fragment(sender, instance, **kwargs):
+    invalidate_recipe(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=IngredientRecipe)
+@receiver(m2m_changed, sender=TagRecipe)
+def invalidate_recipe_m2m_fragment(sender, instance, action, reverse,
+                                   pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipe(instance.id)
+        return
+    invalidate_recipes(pk_set or ())
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_author_fragments(sender, instance, **kwargs):
+    invalidate_user(instance.id)
+
+
+@receiver((post_save, post_delete), sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    for key in Token.objects.filter(user_id=instance.id).values_list(
+        'key', flat=True
+    ):
+        token_cache.delete(key)
+
+
+@receiver(relations_bulk_changed, sender=FavoriteRecipe)
+@receiver(relations_bulk_changed, sender=ShoppingCart)
+def invalidate_bulk_relation_fragments(sender, related_ids, **kwargs):
+    invalidate_recipes(related_ids)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from api.renderers import FastJSONRenderer
+from api.serializers import IngredientSerializer, TagSerializer
+from foodgram.db.routers import PRIMARY_DATABASE
+from recipe.models import Ingredients, Tag
+from recipe.versions import StoredVersion
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CatalogueSnapshot:
+    def __init__(self, name, queryset, serializer_class):
+        self.name = name
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self.lock = threading.Lock()
+        self.version = None
+        self.built_at = None
+        self.bodies = {}
+        self.etag = None
+        self.stored_version = StoredVersion(name)
+
+    def invalidate(self):
+        self.stored_version.bump()
+
+    def get_version(self):
+        return self.stored_version.get()
+
+    def is_stale(self, version):
+        return (
+            self.version != version
+            or time.monotonic() - self.built_at
+            > settings.CATALOGUE_SNAPSHOT_TTL
+        )
+
+    def build(self):
+        body = FastJSONRenderer().render(
+            self.serializer_class(
+                self.queryset.using(PRIMARY_DATABASE), many=True
+            ).data
+        )
+        bodies = {
+            'identity': body,
+            'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        }
+        if brotli is not None:
+            bodies['br'] = brotli.compress(body)
+        return bodies, hashlib.sha1(body).hexdigest()
+
+    def refresh(self):
+        version = self.get_version()
+        if not self.is_stale(version):
+            return
+        with self.lock:
+            if not self.is_stale(version):
+                return
+            self.bodies, self.etag = self.build()
+            self.version = version
+            self.built_at = time.monotonic()
+
+    def get_encoding(self, request):
+        accepted = {
+            coding.split(';')[0].strip()
+            for coding in request.META.get('HTTP_ACCEPT_ENCODING', '')
+            .split(',')
+        }
+        for encoding in ('br', 'gzip'):
+            if encoding in accepted and encoding in self.bodies:
+                return encoding
+        return 'identity'
+
+    def get_etag(self, encoding):
+        if encoding == 'identity':
+            return f'"{self.etag}"'
+        return f'"{self.etag}-{encoding}"'
+
+    def response(self, request):
+        self.refresh()
+        encoding = self.get_encoding(request)
+        etag = self.get_etag(encoding)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if f'"{self.etag}' in if_none_match or if_none_match == '*':
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                self.bodies[encoding], content_type='application/json'
+            )
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+tag_snapshot = CatalogueSnapshot('tags', Tag.objects.all(), TagSerializer)
+ingredient_snapshot = CatalogueSnapshot(
+    'ingredients', Ingredients.objects.all(), IngredientSerializer
+)
@@ -0,0 +1,213 @@
+from django.db.models import Prefetch
+from django.test import TestCase
+
+from api.fast_serializers import build_recipe_fragments, build_subscriptions
+from api.recipe_cache import apply_overlay
+from api.serializers import RecipeGetSerializer, SubscriptionsSerializer
+from api.views import FollowViewSet, RecipeViewSet
+from recipe.models import (FavoriteRecipe, IngredientRecipe, Ingredients,
+                           Recipe, ShoppingCart, ShoppingListItem, Tag)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from users.models import Follow, User
+
+
+class FastSerializersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            password='pass12345', first_name='Иван', last_name='Читатель'
+        )
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author{index}',
+                email=f'author{index}@example.com',
+                password='pass12345',
+                first_name='Анна',
+                last_name=f'Автор{index}'
+            )
+            for index in range(3)
+        ]
+        tags = [
+            Tag.objects.create(name='Завтрак', color='#E26C2D',
+                               slug='breakfast'),
+            Tag.objects.create(name='Обед', color='#49B64E', slug='lunch'),
+        ]
+        ingredients = [
+            Ingredients.objects.create(
+                name=f'Ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(4)
+        ]
+        for index in range(7):
+            recipe = Recipe.objects.create(
+                author=cls.authors[index % 2],
+                name=f'Рецепт {index}',
+                text='Описание',
+                cooking_time=index + 1,
+                image=f'recipes/images/{index}.png'
+            )
+            recipe.tags.set(tags[:index % 2 + 1])
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=index + 10
+                )
+                for ingredient in ingredients[index % 3:]
+            )
+            if index % 2:
+                FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+            if index % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+
+    def get_view(self, view_class, user, recipes_limit=None):
+        params = {} if recipes_limit is None else {
+            'recipes_limit': recipes_limit
+        }
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = user
+        return view_class(request=request, format_kwarg=None, action='list')
+
+    def assert_same_json(self, first, second):
+        self.assertEqual(
+            JSONRenderer().render(first), JSONRenderer().render(second)
+        )
+
+    def test_recipes_match_serializer(self):
+        for user in (self.user, self.authors[0]):
+            with self.subTest(user=user.username):
+                view = self.get_view(RecipeViewSet, user)
+                queryset = view.get_queryset().order_by('-pub_date', '-id')
+                expected = RecipeGetSerializer(
+                    queryset.prefetch_related(
+                        'author',
+                        'tags',
+                        Prefetch(
+                            'ingredientrecipes',
+                            queryset=IngredientRecipe.objects.select_related(
+                                'ingredient'
+                            )
+                        )
+                    ),
+                    many=True,
+                    context={'request': view.request}
+                ).data
+                rows = list(view.get_rows(queryset))
+                fragments = build_recipe_fragments(
+                    [row['id'] for row in rows]
+                )
+                self.assert_same_json([
+                    apply_overlay(fragments[row['id']], row, view.request)
+                    for row in rows
+                ], expected)
+
+    def test_recipe_detail_and_feed_match_serializer(self):
+        view = self.get_view(RecipeViewSet, self.user)
+        queryset = view.get_queryset().order_by('-pub_date', '-id')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        recipe = queryset.first()
+        self.assertEqual(
+            client.get(f'/api/recipes/{recipe.id}/').content,
+            JSONRenderer().render(RecipeGetSerializer(
+                recipe, context={'request': view.request}
+            ).data)
+        )
+        response = client.get('/api/recipes/feed/', {'limit': 100})
+        self.assert_same_json(
+            response.data['results'],
+            RecipeGetSerializer(
+                queryset.filter(author__in=self.authors),
+                many=True,
+                context={'request': view.request}
+            ).data
+        )
+
+    def test_subscriptions_match_serializer(self):
+        for recipes_limit in (None, 0, 1, 10):
+            with self.subTest(recipes_limit=recipes_limit):
+                view = self.get_view(FollowViewSet, self.user, recipes_limit)
+                queryset = view.get_queryset().order_by('-add_date', '-id')
+                expected = SubscriptionsSerializer(
+                    queryset, many=True, context={'request': view.request}
+                ).data
+                self.assert_same_json(build_subscriptions(
+                    list(view.get_rows(queryset)), recipes_limit
+                ), expected)
+
+    def test_subscribe_matches_serializer(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        author = self.authors[0]
+        Follow.objects.filter(user=self.user, author=author).delete()
+        response = client.post(
+            f'/api/users/{author.id}/subscribe/?recipes_limit=2'
+        )
+        self.assertEqual(response.status_code, 201)
+        view = self.get_view(FollowViewSet, self.user, 2)
+        self.assert_same_json(response.data, SubscriptionsSerializer(
+            view.get_queryset().get(author=author),
+            context={'request': view.request}
+        ).data)
+
+
+class BulkRelationsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            password='pass12345', first_name='Иван', last_name='Читатель'
+        )
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='pass12345', first_name='Анна', last_name='Автор'
+        )
+        ingredient = Ingredients.objects.create(
+            name='Мука', measurement_unit='г'
+        )
+        cls.recipes = []
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {index}', text='Описание',
+                cooking_time=10, image=f'recipes/images/{index}.png'
+            )
+            IngredientRecipe.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=100
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_state(self):
+        return (
+            sorted(ShoppingCart.objects.filter(
+                user=self.user
+            ).values_list('recipe_id', flat=True)),
+            list(Recipe.objects.order_by('id').values_list(
+                'cart_count', flat=True
+            )),
+            list(ShoppingListItem.objects.filter(
+                user=self.user
+            ).values_list('amount', flat=True)),
+        )
+
+    def test_replace_and_remove_keep_derived_data(self):
+        ids = [recipe.id for recipe in self.recipes]
+        self.client.post(
+            '/api/recipes/shopping_cart/', {'ids': ids[:2]}, format='json'
+        )
+        self.assertEqual(self.get_state(), (ids[:2], [1, 1, 0], [200]))
+        self.client.put(
+            '/api/recipes/shopping_cart/', {'ids': ids[1:]}, format='json'
+        )
+        self.assertEqual(self.get_state(), (ids[1:], [0, 1, 1], [200]))
+        response = self.client.delete(
+            '/api/recipes/shopping_cart/', {'ids': ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_state(), ([], [0, 0, 0], []))
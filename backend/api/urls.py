@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.urls import include, path, re_path
 
+from api.async_views import async_view
 from api.views import (DownloadShoppingCartViewSet, FavoriteViewSet,
                        FollowViewSet, IngredientViewSet, RecipeViewSet,
-                       ShoppingCartViewSet, TagViewSet, UserViewSet)
+                       ShoppingCartSummaryViewSet, ShoppingCartViewSet,
+                       TagViewSet, UserViewSet)
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
@@ -12,12 +15,52 @@ router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('tags', TagViewSet, basename='tags')
 router.register('recipes', RecipeViewSet, basename='recipes')
 
-urlpatterns = [
+ASYNC_VIEW_NAMES = {
+    'recipes-list', 'recipes-detail', 'tags-list', 'tags-detail',
+    'ingredients-list', 'ingredients-detail', 'subscriptions',
+}
+
+
+def use_async_views(patterns):
+    if settings.ASYNC_VIEWS:
+        for pattern in patterns:
+            if getattr(pattern, 'name', None) in ASYNC_VIEW_NAMES:
+                pattern.callback = async_view(pattern.callback)
+    return patterns
+
+
+urlpatterns = use_async_views([
     path(
         'users/subscriptions/',
         FollowViewSet.as_view({'get': 'list'}),
         name='subscriptions'
     ),
+    path(
+        'recipes/favorite/',
+        FavoriteViewSet.as_view({
+            'post': 'add_many', 'put': 'replace', 'delete': 'remove_many'
+        }),
+        name='favorites_bulk'
+    ),
+    path(
+        'recipes/shopping_cart/',
+        ShoppingCartViewSet.as_view({
+            'post': 'add_many', 'put': 'replace', 'delete': 'remove_many'
+        }),
+        name='shopping_cart_bulk'
+    ),
+    path(
+        'recipes/shopping_cart/summary/',
+        ShoppingCartSummaryViewSet.as_view(),
+        name='shopping_cart_summary'
+    ),
+    path(
+        'users/subscribe/',
+        FollowViewSet.as_view({
+            'post': 'add_many', 'put': 'replace', 'delete': 'remove_many'
+        }),
+        name='subscribe_bulk'
+    ),
     re_path(
         r'recipes/(?P<recipe_id>\d+)/favorite/',
         FavoriteViewSet.as_view({'post': 'create', 'delete': 'delete'}),
@@ -40,5 +83,5 @@ urlpatterns = [
     ),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
-    path('', include(router.urls)),
-]
+    path('', include(use_async_views(router.urls))),
+])
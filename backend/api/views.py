@@ -1,18 +1,35 @@
-from django.http import HttpResponse
+from functools import partial
+
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import PaginationClass
+from api.fast_serializers import build_subscriptions, get_subscription_columns
+from api.filters import RecipeFilter
+from api.pagination import (FeedPaginationClass, FollowPaginationClass,
+                            PaginationClass, RecipePaginationClass)
 from api.permissions import IsAuthorOrReadOnly
+from api.recipe_cache import RECIPE_OVERLAY_FIELDS, get_recipe_representations
+from api.renderers import StreamingListMixin
 from api.serializers import (IngredientSerializer, RecipeGetSerializer,
-                             RecipeSerializer, ShortRecipeSerializer,
-                             SubscriptionsSerializer, TagSerializer,
-                             UserSerializer)
+                             RecipeSerializer, RelatedIdsSerializer,
+                             ShortRecipeSerializer, SubscriptionsSerializer,
+                             TagSerializer, UserSerializer)
+from api.shopping_list import (SHOPPING_LIST_FILENAME, SHOPPING_LIST_FORMATS,
+                               get_shopping_list)
+from api.snapshots import ingredient_snapshot, tag_snapshot
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from recipe.models import (FavoriteRecipe, IngredientRecipe, Ingredients,
-                           Recipe, ShoppingCart, Tag)
+from foodgram.settings import INGREDIENT_SEARCH_LIMIT
+from recipe.feed import get_feed_keys
+from recipe.models import (FavoriteRecipe, Ingredients, Recipe, ShoppingCart,
+                           Tag)
+from recipe.search import ingredient_index
+from recipe.signals import relations_bulk_changed
 from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.mixins import CreateModelMixin, DestroyModelMixin
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
@@ -28,29 +45,100 @@ class TagViewSet(ReadOnlyModelViewSet):
     pagination_class = None
     permission_classes = [AllowAny]
 
+    def list(self, request):
+        return tag_snapshot.response(request)
+
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(StreamingListMixin, ReadOnlyModelViewSet):
     queryset = Ingredients.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     permission_classes = [AllowAny]
-    filter_backends = (DjangoFilterBackend, IngredientFilter)
-    search_fields = ('^name',)
+
+    def list(self, request):
+        name = request.query_params.get('name')
+        if not name:
+            return ingredient_snapshot.response(request)
+        limit = request.query_params.get('limit', '')
+        limit = int(limit) if limit.isdigit() else INGREDIENT_SEARCH_LIMIT
+        return Response(ingredient_index.search(name, limit))
 
 
-class UserViewSet(UserViewSet):
+class UserViewSet(StreamingListMixin, UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = PaginationClass
 
 
-class RecipeViewSet(ModelViewSet):
-    queryset = Recipe.objects.all()
-    pagination_class = PaginationClass
+class RecipeViewSet(StreamingListMixin, ModelViewSet):
+    pagination_class = RecipePaginationClass
     permission_classes = [IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return Recipe.objects.all()
+        return Recipe.objects.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author')
+            ))
+        )
+
+    def get_rows(self, queryset):
+        return queryset.values('id', 'author_id', 'pub_date', *(
+            name for name in (*RECIPE_OVERLAY_FIELDS, 'search_rank')
+            if name in queryset.query.annotations
+        ))
+
+    def get_recipes_response(self, queryset):
+        queryset = self.get_rows(queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                get_recipe_representations(page, self.request)
+            )
+        return Response(
+            get_recipe_representations(list(queryset), self.request)
+        )
+
+    def list(self, request):
+        return self.get_recipes_response(
+            self.filter_queryset(self.get_queryset())
+        )
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPaginationClass
+    )
+    def feed(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        keys = self.paginator.paginate_keys(
+            partial(get_feed_keys, request.user, queryset), request
+        )
+        rows = {
+            row['id']: row for row in self.get_rows(queryset.filter(
+                id__in=[recipe_id for _, recipe_id in keys]
+            ))
+        }
+        return self.get_paginated_response(get_recipe_representations(
+            [rows[recipe_id] for _, recipe_id in keys if recipe_id in rows],
+            request
+        ))
+
+    def retrieve(self, request, pk=None):
+        return Response(
+            get_recipe_representations([vars(self.get_object())], request)[0]
+        )
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeGetSerializer
@@ -61,129 +149,256 @@ class RecipeViewSet(ModelViewSet):
         serializer.save(author=user)
 
 
-class FavoriteViewSet(CreateModelMixin, DestroyModelMixin, GenericViewSet):
+class BulkRelationMixin:
+    relation_model = None
+    related_model = None
+    related_field = None
+
+    def get_ids(self, request):
+        serializer = RelatedIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return set(serializer.validated_data['ids'])
+
+    def validate_ids(self, ids):
+        missing = ids - set(
+            self.related_model.objects.filter(pk__in=ids).values_list(
+                'pk', flat=True
+            )
+        )
+        if missing:
+            raise ValidationError({
+                'ids': 'Не найдены: '
+                + ', '.join(str(pk) for pk in sorted(missing))
+            })
+
+    def insert_relations(self, ids):
+        self.relation_model.objects.bulk_create(
+            (
+                self.relation_model(**{
+                    'user': self.request.user,
+                    f'{self.related_field}_id': pk
+                })
+                for pk in ids
+            ),
+            ignore_conflicts=True
+        )
+
+    def delete_relations(self, ids):
+        if not ids:
+            return
+        meta = self.relation_model._meta
+        connection = connections[router.db_for_write(self.relation_model)]
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote(meta.db_table)} '
+                f'WHERE {quote(meta.get_field("user").column)} = %s '
+                f'AND {quote(meta.get_field(self.related_field).column)} '
+                f'IN ({", ".join(["%s"] * len(ids))})',
+                (self.request.user.id, *ids)
+            )
+
+    def relations_changed(self, ids):
+        relations_bulk_changed.send(
+            sender=self.relation_model,
+            user=self.request.user,
+            related_ids=ids
+        )
+
+    @transaction.atomic
+    def add_many(self, request):
+        ids = self.get_ids(request)
+        self.validate_ids(ids)
+        self.insert_relations(ids)
+        self.relations_changed(ids)
+        return Response({'ids': sorted(ids)})
+
+    @transaction.atomic
+    def replace(self, request):
+        ids = self.get_ids(request)
+        self.validate_ids(ids)
+        stored = set(
+            self.relation_model.objects.filter(
+                user=request.user
+            ).values_list(f'{self.related_field}_id', flat=True)
+        )
+        if stored - ids:
+            self.delete_relations(stored - ids)
+        self.insert_relations(ids - stored)
+        self.relations_changed(ids ^ stored)
+        return Response({'ids': sorted(ids)})
+
+    @transaction.atomic
+    def remove_many(self, request):
+        ids = self.get_ids(request)
+        self.delete_relations(ids)
+        self.relations_changed(ids)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class FavoriteViewSet(BulkRelationMixin, CreateModelMixin, DestroyModelMixin,
+                      GenericViewSet):
     permission_classes = [IsAuthenticated]
+    relation_model = FavoriteRecipe
+    related_model = Recipe
+    related_field = 'recipe'
 
     def get_queryset(self):
         return FavoriteRecipe.objects.filter(user=self.request.user)
 
     def create(self, request, recipe_id):
         recipe = get_object_or_404(Recipe, id=recipe_id)
-        if FavoriteRecipe.objects.filter(user=request.user,
-                                         recipe=recipe).exists():
-            return Response(
-                {'errors': 'Этот рецепт уже есть в Избранном'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        FavoriteRecipe.objects.create(user=request.user, recipe=recipe)
+        _, created = FavoriteRecipe.objects.get_or_create(
+            user=request.user, recipe=recipe
+        )
         serializer = ShortRecipeSerializer(recipe, many=False)
-        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
+            data=serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
 
     def delete(self, request, recipe_id):
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-        if not FavoriteRecipe.objects.filter(user=request.user,
-                                             recipe=recipe).exists():
-            return Response(
-                {'errors': 'В Избранном нет такого рецепта '},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        get_object_or_404(FavoriteRecipe, user=request.user,
-                          recipe=recipe).delete()
+        FavoriteRecipe.objects.filter(
+            user=request.user, recipe_id=recipe_id
+        ).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ShoppingCartViewSet(CreateModelMixin, DestroyModelMixin, GenericViewSet):
+class ShoppingCartViewSet(BulkRelationMixin, CreateModelMixin,
+                          DestroyModelMixin, GenericViewSet):
     permission_classes = [IsAuthenticated]
+    relation_model = ShoppingCart
+    related_model = Recipe
+    related_field = 'recipe'
 
     def get_queryset(self):
         return ShoppingCart.objects.filter(user=self.request.user)
 
     def create(self, request, recipe_id):
         recipe = get_object_or_404(Recipe, id=recipe_id)
-        if ShoppingCart.objects.filter(user=request.user,
-                                       recipe=recipe).exists():
-            return Response(
-                {'errors': 'Этот рецепт уже добавлен в список покупок'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        ShoppingCart.objects.create(user=request.user, recipe=recipe)
+        _, created = ShoppingCart.objects.get_or_create(
+            user=request.user, recipe=recipe
+        )
         serializer = ShortRecipeSerializer(recipe, many=False)
-        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
+            data=serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
 
     def delete(self, request, recipe_id):
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-        if not ShoppingCart.objects.filter(user=request.user,
-                                           recipe=recipe).exists():
-            return Response(
-                {'errors': 'В списке покупок нет такого рецепта '},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        get_object_or_404(ShoppingCart, user=request.user,
-                          recipe=recipe).delete()
+        ShoppingCart.objects.filter(
+            user=request.user, recipe_id=recipe_id
+        ).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class DownloadShoppingCartViewSet(APIView):
     def get(self, request):
-        user = request.user
-        recipes_list = ShoppingCart.objects.filter(user=user).values('recipe')
-        recipes = Recipe.objects.filter(pk__in=recipes_list)
-        shopping_list_dict = {}
-        recipe_count = 0
-        for recipe in recipes:
-            recipe_count = recipe_count + 1
-            ing_amounts_list = IngredientRecipe.objects.filter(recipe=recipe)
-            for ing in ing_amounts_list:
-                if ing.ingredient.name in shopping_list_dict:
-                    shopping_list_dict[ing.ingredient.name][0] += ing.amount
-                else:
-                    shopping_list_dict[ing.ingredient.name] = [
-                        ing.amount, ing.ingredient.measurement_unit
-                    ]
-        shop_string = (
-            f'Отобрано рецептов: {recipe_count}\n\n'
-            f'Необходимые ингредиенты:\n\n')
-        for key, value in shopping_list_dict.items():
-            shop_string += f'{key} ({value[1]}) - {str(value[0])}\n'
-        response = HttpResponse(
-            shop_string,
-            content_type='text/plain, charset=utf8'
-        )
-        response['Content-Disposition'] = 'attachment; filename="cart.txt"'
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in SHOPPING_LIST_FORMATS:
+            return Response(
+                {'errors': 'Неподдерживаемый формат списка покупок'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        render, content_type = SHOPPING_LIST_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            render(
+                ShoppingCart.objects.filter(user=request.user).count(),
+                list(get_shopping_list(request.user))
+            ),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{SHOPPING_LIST_FILENAME}.{file_format}"'
+        )
         return response
 
 
-class FollowViewSet(ModelViewSet):
+class ShoppingCartSummaryViewSet(APIView):
+    def get(self, request):
+        return Response({
+            'recipes_count': ShoppingCart.objects.filter(
+                user=request.user
+            ).count(),
+            'ingredients': [
+                {
+                    'id': item['ingredient__id'],
+                    'name': item['ingredient__name'],
+                    'measurement_unit': item['ingredient__measurement_unit'],
+                    'amount': item['total_amount'],
+                }
+                for item in get_shopping_list(request.user)
+            ]
+        })
+
+
+class FollowViewSet(StreamingListMixin, BulkRelationMixin, ModelViewSet):
     serializer_class = SubscriptionsSerializer
-    pagination_class = PaginationClass
+    pagination_class = FollowPaginationClass
     permission_classes = [IsAuthenticated]
+    relation_model = Follow
+    related_model = User
+    related_field = 'author'
 
     def get_queryset(self):
-        return Follow.objects.filter(user=self.request.user)
+        return (
+            Follow.objects
+            .filter(user=self.request.user)
+            .select_related('author')
+        )
+
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit is None:
+            return None
+        if not recipes_limit.isdigit():
+            raise ValidationError(
+                {'recipes_limit': 'Должно быть целым неотрицательным числом'}
+            )
+        return int(recipes_limit)
+
+    def get_rows(self, queryset):
+        return queryset.values('id', 'add_date', *get_subscription_columns())
+
+    def list(self, request):
+        queryset = self.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                build_subscriptions(page, self.get_recipes_limit())
+            )
+        return Response(
+            build_subscriptions(list(queryset), self.get_recipes_limit())
+        )
+
+    def validate_ids(self, ids):
+        if self.request.user.id in ids:
+            raise ValidationError(
+                {'errors': 'Нельзя подписаться на самого себя'}
+            )
+        super().validate_ids(ids)
 
     def create(self, request, author_id):
         author = get_object_or_404(User, id=author_id)
-        if Follow.objects.filter(user=request.user,
-                                 author=author).exists():
-            return Response(
-                {'errors': 'Вы уже подписаны на этого автора'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
         if request.user == author:
             return Response(
                 {'errors': 'Нельзя подписаться на самого себя'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        Follow.objects.create(user=request.user, author=author)
-        serializer = SubscriptionsSerializer(
-            get_object_or_404(Follow, user=request.user,
-                              author=author),
-            many=False
+        recipes_limit = self.get_recipes_limit()
+        follow, created = Follow.objects.get_or_create(
+            user=request.user, author=author
+        )
+        return Response(
+            data=build_subscriptions(
+                list(self.get_rows(self.get_queryset().filter(pk=follow.pk))),
+                recipes_limit
+            )[0],
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
         )
-        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, author_id):
-        author = get_object_or_404(User, id=author_id)
-        get_object_or_404(Follow, user=request.user,
-                          author=author).delete()
+        Follow.objects.filter(
+            user=request.user, author_id=author_id
+        ).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
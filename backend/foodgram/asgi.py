@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
 
 application = get_asgi_application()
+
+from recipe.inverted_index import recipe_ingredient_index  # noqa: E402
+from recipe.search import ingredient_index  # noqa: E402
+
+ingredient_index.start_rebuild()
+recipe_ingredient_index.start_rebuild()
@@ -0,0 +1,15 @@
+class CounterFieldsMixin:
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+
+POOL_DEFAULTS = {
+    'SIZE': 10,
+    'MAX_AGE': 600,
+    'TIMEOUT': 5,
+    'CHECK_INTERVAL': 0,
+}
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+
+
+class ConnectionPool:
+    def __init__(self, size, max_age, timeout, check_interval):
+        self.size = size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.in_use = {}
+        self.opening = 0
+        self.stats = {
+            'created': 0,
+            'recycled': 0,
+            'check_failures': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+        }
+
+    def is_expired(self, pooled, now):
+        return now - pooled.created_at > self.max_age
+
+    def discard(self, pooled):
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+
+    def count(self, name, value=1):
+        with self.condition:
+            self.stats[name] += value
+
+    def checkout(self, pooled, check):
+        now = time.monotonic()
+        if self.is_expired(pooled, now):
+            self.count('recycled')
+            return False
+        if now - pooled.released_at < self.check_interval:
+            return True
+        try:
+            check(pooled.connection)
+        except Exception:
+            self.count('check_failures')
+            return False
+        return True
+
+    def record_wait(self, waited):
+        if waited is not None:
+            self.stats['waits'] += 1
+            self.stats['wait_seconds'] += time.monotonic() - waited
+
+    def reserve(self):
+        deadline = time.monotonic() + self.timeout
+        waited = None
+        with self.condition:
+            while True:
+                if self.idle or len(self.in_use) + self.opening < self.size:
+                    break
+                if waited is None:
+                    waited = time.monotonic()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.record_wait(waited)
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'Нет свободных соединений за {self.timeout} с'
+                    )
+                self.condition.wait(remaining)
+            self.record_wait(waited)
+            self.opening += 1
+            return self.idle.pop() if self.idle else None
+
+    def acquire(self, connect, check):
+        pooled = self.reserve()
+        try:
+            while pooled is not None:
+                if self.checkout(pooled, check):
+                    break
+                self.discard(pooled)
+                with self.condition:
+                    pooled = self.idle.pop() if self.idle else None
+            else:
+                pooled = PooledConnection(connect())
+                self.count('created')
+        except Exception:
+            with self.condition:
+                self.opening -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opening -= 1
+            self.in_use[id(pooled.connection)] = pooled
+        return pooled.connection
+
+    def release(self, connection, reusable=True):
+        with self.condition:
+            pooled = self.in_use.pop(id(connection), None)
+        if pooled is None:
+            connection.close()
+            return
+        if reusable and not self.is_expired(pooled, time.monotonic()):
+            try:
+                connection.rollback()
+            except Exception:
+                reusable = False
+        else:
+            reusable = False
+        if reusable:
+            pooled.released_at = time.monotonic()
+        else:
+            self.discard(pooled)
+        with self.condition:
+            if reusable:
+                self.idle.append(pooled)
+            self.condition.notify()
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'in_use': len(self.in_use),
+                'idle': len(self.idle),
+                **self.stats,
+            }
+
+
+def get_pool(alias, options):
+    if alias not in pools:
+        with pools_lock:
+            if alias not in pools:
+                options = {**POOL_DEFAULTS, **options}
+                pools[alias] = ConnectionPool(
+                    size=options['SIZE'],
+                    max_age=options['MAX_AGE'],
+                    timeout=options['TIMEOUT'],
+                    check_interval=options['CHECK_INTERVAL']
+                )
+    return pools[alias]
+
+
+def get_pool_stats():
+    return {alias: pool.get_stats() for alias, pool in list(pools.items())}
+
+
+def forget_pools():
+    pools.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=forget_pools)
+
+
+class PooledDatabaseWrapperMixin:
+    check_query = 'SELECT 1'
+
+    def get_pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL') or {})
+
+    def check_connection(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(self.check_query)
+            cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self.get_pool().acquire(
+                partial(super().get_new_connection, conn_params),
+                self.check_connection
+            )
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error)) from error
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.get_pool().release(
+                    self.connection,
+                    reusable=not (self.in_atomic_block or self.errors_occurred)
+                )
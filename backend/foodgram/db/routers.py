@@ -0,0 +1,92 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import LazyObject
+
+PRIMARY_DATABASE = 'default'
+PRIMARY_MODELS = {'authtoken.Token', 'sessions.Session'}
+
+replica_request = ContextVar('replica_request', default=None)
+
+
+def get_pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def get_shared_cache():
+    if settings.SHARED_CACHE_ALIAS is None:
+        return None
+    return caches[settings.SHARED_CACHE_ALIAS]
+
+
+def pin_to_primary(response, user_id):
+    response.set_signed_cookie(
+        settings.REPLICA_PIN_COOKIE,
+        user_id,
+        salt=settings.REPLICA_PIN_COOKIE,
+        max_age=settings.REPLICA_PIN_SECONDS,
+        httponly=True,
+        samesite='Lax'
+    )
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.set(get_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(request, user_id):
+    if request.get_signed_cookie(
+        settings.REPLICA_PIN_COOKIE,
+        default=None,
+        salt=settings.REPLICA_PIN_COOKIE,
+        max_age=settings.REPLICA_PIN_SECONDS
+    ) == str(user_id):
+        return True
+    shared = get_shared_cache()
+    return shared is not None and shared.get(get_pin_key(user_id), False)
+
+
+def get_request_user(request):
+    user = getattr(request, 'user', None)
+    if user is None or isinstance(user, LazyObject):
+        return None
+    return user if user.is_authenticated else None
+
+
+def get_read_database(request):
+    user = get_request_user(request)
+    if user is not None:
+        pinned = getattr(request, 'replica_pinned_user', None)
+        if pinned != user.id:
+            request.replica_pinned_user = user.id
+            request.replica_pinned = is_pinned(request, user.id)
+        if request.replica_pinned:
+            return PRIMARY_DATABASE
+    if getattr(request, 'replica_alias', None) is None:
+        request.replica_alias = random.choice(settings.DATABASE_REPLICAS)
+    return request.replica_alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        request = replica_request.get()
+        if (
+            request is None
+            or not settings.DATABASE_REPLICAS
+            or model._meta.label in PRIMARY_MODELS
+        ):
+            return PRIMARY_DATABASE
+        return get_read_database(request)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DATABASE
@@ -0,0 +1,63 @@
+import sqlite3
+from functools import partial
+
+from django.test import SimpleTestCase
+
+from foodgram.db.pool import ConnectionPool, PoolTimeout
+
+
+def check(connection):
+    connection.execute('SELECT 1').fetchone()
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def get_pool(self, **options):
+        return ConnectionPool(**{
+            'size': 2,
+            'max_age': 600,
+            'timeout': 1,
+            'check_interval': 0,
+            **options,
+        })
+
+    def acquire(self, pool):
+        return pool.acquire(
+            partial(sqlite3.connect, ':memory:', check_same_thread=False),
+            check
+        )
+
+    def test_reuses_released_connection(self):
+        pool = self.get_pool()
+        connection = self.acquire(pool)
+        pool.release(connection)
+        self.assertIs(self.acquire(pool), connection)
+        self.assertEqual(pool.get_stats()['created'], 1)
+
+    def test_replaces_connection_failing_check(self):
+        pool = self.get_pool()
+        connection = self.acquire(pool)
+        pool.release(connection)
+        connection.close()
+        replacement = self.acquire(pool)
+        self.assertIsNot(replacement, connection)
+        check(replacement)
+        self.assertEqual(pool.get_stats()['check_failures'], 1)
+        self.assertEqual(pool.get_stats()['created'], 2)
+
+    def test_recycles_connection_by_max_age(self):
+        pool = self.get_pool(max_age=60)
+        connection = self.acquire(pool)
+        pool.release(connection)
+        pool.idle[0].created_at -= 120
+        self.assertIsNot(self.acquire(pool), connection)
+        self.assertEqual(pool.get_stats()['recycled'], 1)
+
+    def test_times_out_when_exhausted(self):
+        pool = self.get_pool(size=1, timeout=0.05)
+        connection = self.acquire(pool)
+        with self.assertRaises(PoolTimeout):
+            self.acquire(pool)
+        stats = pool.get_stats()
+        self.assertEqual((stats['in_use'], stats['timeouts']), (1, 1))
+        pool.release(connection)
+        self.assertIs(self.acquire(pool), connection)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,6 +32,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -74,9 +77,60 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'POOL': {
+            'SIZE': int(os.getenv('DB_POOL_SIZE', default=10)),
+            'MAX_AGE': int(os.getenv('DB_POOL_MAX_AGE', default=600)),
+            'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', default=5)),
+            'CHECK_INTERVAL': int(
+                os.getenv('DB_POOL_CHECK_INTERVAL', default=0)
+            ),
+        },
+    }
+}
+
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')), 1
+):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(f'replica{index}')
+DATABASE_ROUTERS = ['foodgram.db.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', default=10))
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipes': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recipes',
+        'TIMEOUT': 24 * 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
+SHARED_CACHE_LOCATION = os.getenv('SHARED_CACHE_LOCATION')
+SHARED_CACHE_ALIAS = None
+if SHARED_CACHE_LOCATION:
+    CACHES['shared'] = {
+        'BACKEND': os.getenv(
+            'SHARED_CACHE_BACKEND',
+            default='django.core.cache.backends.memcached.PyMemcacheCache'
+        ),
+        'LOCATION': SHARED_CACHE_LOCATION,
+    }
+    SHARED_CACHE_ALIAS = 'shared'
+RECIPE_CACHE_ALIAS = 'recipes'
+TOKEN_CACHE_TTL = 300
+TOKEN_LOCAL_CACHE_TTL = 30
+TOKEN_LOCAL_CACHE_SIZE = 10000
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -114,7 +168,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -156,6 +214,13 @@ STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+RECIPE_IMAGE_VARIANTS_DIR = "recipes/images/variants/"
+RECIPE_IMAGE_SIZES = {
+    "card": (480, 480),
+    "detail": (1200, 1200),
+    "original": None,
+}
+RECIPE_IMAGE_WORKERS = int(os.getenv("RECIPE_IMAGE_WORKERS", default=2))
 
 
 EMAIL_MAX_LENGTH = 254
@@ -166,6 +231,33 @@ SLUG_MAX_LENGTH = 50
 NAME_MAX_LENGTH = 200
 TITLE_TEXT_LENGTH = 30
 PAGE_SIZE = 5
+BULK_RELATIONS_LIMIT = 1000
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_SEARCH_SIMILARITY = 0.3
+INGREDIENT_INDEX_TTL = 300
+RECIPE_INGREDIENT_INDEX_TTL = 600
+RECIPE_INGREDIENT_INDEX_MAX_IDS = 1000
+CATALOGUE_SNAPSHOT_TTL = 3600
+CATALOGUE_VERSION_CHECK_INTERVAL = 2
+FEED_FANOUT_LIMIT = 5000
+FEED_BACKFILL_SIZE = 100
+FEED_BATCH_SIZE = 1000
+FEED_MAX_ENTRIES = 1000
+RECIPE_SEARCH_CONFIG = 'russian'
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='True') == 'True'
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram-metrics')
+)
+METRICS_FLUSH_INTERVAL = 5
+METRICS_DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+METRICS_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+JSON_STREAM_MIN_ITEMS = 100
+JSON_STREAM_CHUNK_SIZE = 50
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', default='False') == 'True'
+ASYNC_VIEW_WORKERS = int(os.getenv('ASYNC_VIEW_WORKERS', default=8))
 
 
 UNCORRECT_USERNAME_CHARS = r"[^\w.@+-]"
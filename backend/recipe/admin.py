@@ -2,6 +2,7 @@ from django.contrib import admin
 
 from recipe.models import (FavoriteRecipe, IngredientRecipe, Ingredients,
                            Recipe, ShoppingCart, Tag, TagRecipe)
+from recipe.signals import recipe_ingredients_changed
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -45,6 +46,8 @@ class RecipeAdmin(admin.ModelAdmin):
         'image',
         'text',
         'cooking_time',
+        'favorites_count',
+        'cart_count',
     )
     search_fields = (
         'name',
@@ -52,6 +55,37 @@ class RecipeAdmin(admin.ModelAdmin):
         'cooking_time',
     )
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not IngredientRecipe:
+            super().save_formset(request, form, formset, change)
+            return
+        stored = {
+            inline_form.initial['ingredient']
+            for inline_form in formset.initial_forms
+        }
+        super().save_formset(request, form, formset, change)
+        saved = set()
+        ingredient_ids = set()
+        for inline_form in formset.forms:
+            ingredient_id = inline_form.instance.ingredient_id
+            if ingredient_id is not None and (
+                inline_form not in formset.deleted_forms
+            ):
+                saved.add(ingredient_id)
+            if inline_form.has_changed():
+                ingredient_ids.update((
+                    inline_form.initial.get('ingredient'), ingredient_id
+                ))
+        ingredient_ids.discard(None)
+        if ingredient_ids:
+            recipe_ingredients_changed.send(
+                sender=Recipe,
+                recipe=form.instance,
+                ingredient_ids=ingredient_ids,
+                added_ids=saved - stored,
+                removed_ids=stored - saved
+            )
+
 
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = (
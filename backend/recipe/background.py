@@ -0,0 +1,29 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.RECIPE_IMAGE_WORKERS, 1),
+    thread_name_prefix='recipe-background'
+)
+
+
+def run_task(function, args, in_worker=True):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s не выполнена', function.__name__)
+    finally:
+        if in_worker:
+            connections.close_all()
+
+
+def run_in_background(function, *args):
+    if not settings.RECIPE_IMAGE_WORKERS:
+        run_task(function, args, in_worker=False)
+        return
+    executor.submit(run_task, function, args)
@@ -0,0 +1,42 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipe.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Follow, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (Recipe, 'cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(source_model, related_field):
+    return Coalesce(
+        Subquery(
+            source_model.objects
+            .filter(**{related_field: OuterRef('pk')})
+            .order_by()
+            .values(related_field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def refresh_counters(source_model, pks):
+    for model, field, counted_model, related_field in COUNTERS:
+        if counted_model is source_model:
+            model.objects.filter(pk__in=pks).update(
+                **{field: count_subquery(source_model, related_field)}
+            )
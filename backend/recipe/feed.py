@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
+
+from recipe.models import FeedEntry, Recipe
+from users.models import Follow
+
+
+def is_fanout_author(author):
+    return author.followers_count <= settings.FEED_FANOUT_LIMIT
+
+
+def trim_feeds(user_ids):
+    FeedEntry.objects.filter(
+        user__in=user_ids,
+        pub_date__lt=Subquery(
+            FeedEntry.objects.filter(
+                user=OuterRef('user')
+            ).order_by('-pub_date', '-recipe').values('pub_date')[
+                settings.FEED_MAX_ENTRIES - 1:settings.FEED_MAX_ENTRIES
+            ]
+        )
+    ).delete()
+
+
+def fan_out_recipe(recipe_id):
+    recipe = Recipe.objects.select_related('author').filter(
+        pk=recipe_id
+    ).first()
+    if recipe is None or not is_fanout_author(recipe.author):
+        return
+    followers = Follow.objects.filter(author_id=recipe.author_id)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe_id, pub_date=recipe.pub_date
+            )
+            for user_id in followers.values_list(
+                'user_id', flat=True
+            ).iterator()
+        ),
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim_feeds(followers.values('user'))
+
+
+def add_to_feed(user_id, author_ids):
+    recipes = Recipe.objects.filter(
+        author_id__in=author_ids,
+        author__followers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).order_by('-pub_date', '-id').values_list('id', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes[:settings.FEED_BACKFILL_SIZE]
+        ),
+        ignore_conflicts=True
+    )
+    trim_feeds([user_id])
+
+
+def remove_from_feed(user_id, author_ids):
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id__in=author_ids
+    ).delete()
+
+
+def refresh_feed(user_id, author_ids):
+    followed = set(
+        Follow.objects.filter(
+            user_id=user_id, author_id__in=author_ids
+        ).values_list('author_id', flat=True)
+    )
+    remove_from_feed(user_id, set(author_ids) - followed)
+    add_to_feed(user_id, followed)
+
+
+def before(position, id_field):
+    if position is None:
+        return Q()
+    pub_date, recipe_id = position
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'{id_field}__lt': recipe_id}
+    )
+
+
+def get_feed_keys(user, queryset, position, limit):
+    entries = FeedEntry.objects.filter(before(position, 'recipe'), user=user)
+    if queryset.query.has_filters():
+        entries = entries.filter(recipe__in=queryset.values('id'))
+    recipes = queryset.filter(
+        before(position, 'id'),
+        author__in=Follow.objects.filter(
+            user=user,
+            author__followers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values('author')
+    )
+    return sorted(
+        {
+            *entries.order_by('-pub_date', '-recipe').values_list(
+                'pub_date', 'recipe'
+            )[:limit],
+            *recipes.order_by('-pub_date', '-id').values_list(
+                'pub_date', 'id'
+            )[:limit],
+        },
+        reverse=True
+    )[:limit]
@@ -0,0 +1,83 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from recipe.models import Recipe
+
+SEARCH_FIELDS = ('name', 'text')
+SQLITE_SEARCH_TABLE = 'recipe_search'
+
+
+def get_search_vector():
+    return (
+        SearchVector(
+            'name', weight='A', config=settings.RECIPE_SEARCH_CONFIG
+        )
+        + SearchVector(
+            'text', weight='B', config=settings.RECIPE_SEARCH_CONFIG
+        )
+    )
+
+
+def get_sqlite_query(query):
+    return ' '.join(
+        f'"{word}"*' for word in re.findall(r'\w+', query.lower())
+    )
+
+
+def update_search_index(recipe_ids):
+    if connection.vendor == 'postgresql':
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=get_search_vector()
+        )
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {SQLITE_SEARCH_TABLE}'
+                f'(rowid, name, text) VALUES (%s, %s, %s)',
+                list(Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                    'id', *SEARCH_FIELDS
+                ))
+            )
+
+
+def delete_from_search_index(recipe_id):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SQLITE_SEARCH_TABLE} WHERE rowid = %s',
+                [recipe_id]
+            )
+
+
+def search_recipes(queryset, query):
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            query,
+            config=settings.RECIPE_SEARCH_CONFIG,
+            search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-search_rank', '-pub_date', '-id')
+    if connection.vendor == 'sqlite':
+        match = get_sqlite_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {SQLITE_SEARCH_TABLE} '
+            f'WHERE {SQLITE_SEARCH_TABLE} MATCH %s',
+            [match]
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({SQLITE_SEARCH_TABLE}) FROM {SQLITE_SEARCH_TABLE} '
+            f'WHERE {SQLITE_SEARCH_TABLE} MATCH %s '
+            f'AND rowid = {Recipe._meta.db_table}.id',
+            [match],
+            output_field=FloatField()
+        )).order_by('-search_rank', '-pub_date', '-id')
+    return queryset.filter(Q(name__icontains=query) | Q(text__icontains=query))
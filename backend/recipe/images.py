@@ -0,0 +1,109 @@
+import logging
+import os
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from PIL import Image
+from recipe.background import run_in_background
+from recipe.models import Recipe
+
+IMAGE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+logger = logging.getLogger(__name__)
+
+pending = set()
+pending_lock = threading.Lock()
+
+
+def render_image_variants(data):
+    with Image.open(BytesIO(data)) as source:
+        source.load()
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA')
+        variants = {}
+        for size, max_size in settings.RECIPE_IMAGE_SIZES.items():
+            image = source.copy()
+            if max_size is not None:
+                image.thumbnail(max_size, Image.LANCZOS)
+            for image_format, (pillow_format, options) in (
+                IMAGE_FORMATS.items()
+            ):
+                converted = image
+                if pillow_format == 'JPEG' and image.mode == 'RGBA':
+                    converted = Image.new('RGB', image.size, (255, 255, 255))
+                    converted.paste(image, mask=image.getchannel('A'))
+                buffer = BytesIO()
+                converted.save(buffer, pillow_format, **options)
+                variants[size, image_format] = buffer.getvalue()
+        return variants
+
+
+def save_image_variants(name, variants):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    saved = {'source': name}
+    for (size, image_format), data in variants.items():
+        saved.setdefault(size, {})[image_format] = default_storage.save(
+            f'{settings.RECIPE_IMAGE_VARIANTS_DIR}{stem}_{size}.'
+            f'{image_format}',
+            ContentFile(data)
+        )
+    return saved
+
+
+def get_variant_names(image_variants):
+    return {
+        name
+        for size, formats in image_variants.items() if size != 'source'
+        for name in formats.values()
+    }
+
+
+def store_image_variants(recipe, variants):
+    stale = get_variant_names(recipe.image_variants)
+    recipe.image_variants = save_image_variants(recipe.image.name, variants)
+    recipe.save(update_fields=['image_variants'])
+    for name in stale - get_variant_names(recipe.image_variants):
+        default_storage.delete(name)
+
+
+def needs_image_variants(recipe):
+    return bool(recipe.image) and (
+        recipe.image_variants.get('source') != recipe.image.name
+    )
+
+
+def process_recipe_image(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not needs_image_variants(recipe):
+        return
+    with recipe.image.open('rb') as image_file:
+        variants = render_image_variants(image_file.read())
+    store_image_variants(recipe, variants)
+
+
+def run_image_processing(task):
+    try:
+        process_recipe_image(task[0])
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', task[1])
+    finally:
+        with pending_lock:
+            pending.discard(task)
+
+
+def schedule_image_processing(recipe):
+    if not needs_image_variants(recipe):
+        return
+    task = (recipe.id, recipe.image.name)
+    with pending_lock:
+        if task in pending:
+            return
+        pending.add(task)
+    run_in_background(run_image_processing, task)
@@ -0,0 +1,392 @@
+import csv
+import json
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from api.serializers import RecipeSerializer
+from api.snapshots import ingredient_snapshot, tag_snapshot
+from recipe.models import IngredientRecipe, Ingredients, Recipe, Tag, TagRecipe
+from recipe.search import ingredient_index
+from users.models import User
+
+DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_SEPARATORS = re.compile(r'[\s,]*')
+FORMATS = {
+    '.csv': 'csv',
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+def read_csv(file, fields):
+    for row in csv.reader(file):
+        if not row or row == list(fields):
+            continue
+        yield dict(zip(fields, row))
+
+
+def read_ndjson(file, fields):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json(file, fields):
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидался JSON-массив')
+    position = 1
+    while True:
+        position = JSON_SEPARATORS.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+    'ndjson': read_ndjson,
+}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Importer(ABC):
+    model = None
+    key_fields = ()
+    update_fields = ()
+    csv_fields = ()
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.skipped = 0
+
+    @abstractmethod
+    def clean(self, row):
+        pass
+
+    def get_key(self, row):
+        return tuple(row[field] for field in self.key_fields)
+
+    def get_existing(self, keys):
+        return self.model.objects.filter(**{
+            f'{self.key_fields[0]}__in': {key[0] for key in keys}
+        })
+
+    def import_chunk(self, rows):
+        rows = {self.get_key(row): row for row in rows}
+        existing = {
+            self.get_key(vars(instance)): instance
+            for instance in self.get_existing(rows)
+        }
+        created = []
+        updated = []
+        diff = []
+        for key, row in rows.items():
+            instance = existing.get(key)
+            if instance is None:
+                created.append(self.model(**row))
+                diff.append(f'+ {key}')
+                continue
+            changes = {
+                field: (getattr(instance, field), row[field])
+                for field in self.update_fields
+                if getattr(instance, field) != row[field]
+            }
+            if changes:
+                for field, (old, new) in changes.items():
+                    setattr(instance, field, new)
+                    diff.append(f'~ {key} {field}: {old} -> {new}')
+                updated.append(instance)
+        if not self.dry_run:
+            self.model.objects.bulk_create(created, ignore_conflicts=True)
+            if updated:
+                self.model.objects.bulk_update(updated, self.update_fields)
+        return len(created), len(updated), diff
+
+    def finish(self):
+        pass
+
+
+class IngredientImporter(Importer):
+    model = Ingredients
+    key_fields = ('name', 'measurement_unit')
+    csv_fields = ('name', 'measurement_unit')
+
+    def clean(self, row):
+        name = str(row['name']).strip()
+        measurement_unit = str(row['measurement_unit']).strip()
+        if not name or not measurement_unit:
+            raise ValueError('Пустое название или единица измерения')
+        return {'name': name, 'measurement_unit': measurement_unit}
+
+    def finish(self):
+        ingredient_snapshot.invalidate()
+        ingredient_index.invalidate()
+
+
+class TagImporter(Importer):
+    model = Tag
+    key_fields = ('slug',)
+    update_fields = ('name', 'color')
+    csv_fields = ('name', 'color', 'slug')
+
+    def clean(self, row):
+        values = {field: str(row[field]).strip() for field in self.csv_fields}
+        if not all(values.values()):
+            raise ValueError('Пустое название, цвет или slug')
+        values['color'] = values['color'].upper()
+        return values
+
+    def finish(self):
+        tag_snapshot.invalidate()
+
+
+class RecipeImporter(Importer):
+    model = Recipe
+    update_fields = ('text', 'cooking_time', 'image')
+
+    def clean(self, row):
+        cooking_time = int(row['cooking_time'])
+        if cooking_time < 1:
+            raise ValueError('Время приготовления меньше минуты')
+        return {
+            'author': str(row['author']).strip(),
+            'name': str(row['name']).strip(),
+            'text': str(row['text']),
+            'cooking_time': cooking_time,
+            'image': str(row['image']),
+            'tags': sorted(set(row.get('tags') or [])),
+            'ingredients': {
+                (
+                    str(ingredient['name']).strip(),
+                    str(ingredient['measurement_unit']).strip()
+                ): int(ingredient['amount'])
+                for ingredient in row.get('ingredients') or []
+            },
+        }
+
+    def resolve(self, rows):
+        authors = dict(User.objects.filter(
+            email__in={row['author'] for row in rows}
+        ).values_list('email', 'id'))
+        tags = {
+            tag.slug: tag for tag in Tag.objects.filter(
+                slug__in={slug for row in rows for slug in row['tags']}
+            )
+        }
+        ingredients = {
+            (name, measurement_unit): ingredient_id
+            for ingredient_id, name, measurement_unit in (
+                Ingredients.objects.filter(name__in={
+                    name for row in rows for name, _ in row['ingredients']
+                }).values_list('id', 'name', 'measurement_unit')
+            )
+        }
+        return authors, tags, ingredients
+
+    def get_stored(self, recipes):
+        tags = {}
+        for recipe_id, tag_id in TagRecipe.objects.filter(
+            recipe__in=recipes
+        ).values_list('recipe_id', 'tag_id'):
+            tags.setdefault(recipe_id, set()).add(tag_id)
+        ingredients = {}
+        for recipe_id, ingredient_id, amount in (
+            IngredientRecipe.objects
+            .filter(recipe__in=recipes)
+            .values_list('recipe_id', 'ingredient_id', 'amount')
+        ):
+            ingredients.setdefault(recipe_id, {})[ingredient_id] = amount
+        return tags, ingredients
+
+    def import_chunk(self, rows):
+        authors, tags, ingredients = self.resolve(rows)
+        existing = {
+            (recipe.author_id, recipe.name): recipe
+            for recipe in Recipe.objects.filter(
+                author_id__in=authors.values(),
+                name__in={row['name'] for row in rows}
+            )
+        }
+        stored_tags, stored_ingredients = self.get_stored(existing.values())
+        writer = RecipeSerializer()
+        created = updated = 0
+        diff = []
+        for row in rows:
+            missing = (
+                ({row['author']} - authors.keys())
+                | (set(row['tags']) - tags.keys())
+                | {
+                    f'{name} ({measurement_unit})'
+                    for name, measurement_unit in row['ingredients']
+                    if (name, measurement_unit) not in ingredients
+                }
+            )
+            if missing:
+                self.skipped += 1
+                diff.append(
+                    f'! {row["name"]}: не найдены {", ".join(sorted(missing))}'
+                )
+                continue
+            author_id = authors[row['author']]
+            recipe_tags = [tags[slug] for slug in row['tags']]
+            amounts = {
+                ingredients[key]: amount
+                for key, amount in row['ingredients'].items()
+            }
+            recipe = existing.get((author_id, row['name']))
+            if recipe is None:
+                created += 1
+                diff.append(f'+ {row["name"]}')
+                if self.dry_run:
+                    continue
+                recipe = Recipe.objects.create(
+                    author_id=author_id,
+                    name=row['name'],
+                    text=row['text'],
+                    cooking_time=row['cooking_time'],
+                    image=row['image']
+                )
+                existing[author_id, row['name']] = recipe
+                writer.save_tags(recipe, recipe_tags, created=True)
+                writer.save_ingredients(recipe, [
+                    {'id': ingredient_id, 'amount': amount}
+                    for ingredient_id, amount in amounts.items()
+                ], created=True)
+                continue
+            changes = [
+                field for field in self.update_fields
+                if getattr(recipe, field) != row[field]
+            ]
+            tags_changed = (
+                stored_tags.get(recipe.id, set())
+                != {tag.id for tag in recipe_tags}
+            )
+            ingredients_changed = (
+                stored_ingredients.get(recipe.id, {}) != amounts
+            )
+            if tags_changed:
+                changes.append('tags')
+            if ingredients_changed:
+                changes.append('ingredients')
+            if not changes:
+                continue
+            updated += 1
+            diff.append(f'~ {row["name"]}: {", ".join(changes)}')
+            if self.dry_run:
+                continue
+            fields = [
+                field for field in self.update_fields if field in changes
+            ]
+            if fields:
+                for field in fields:
+                    setattr(recipe, field, row[field])
+                recipe.save(update_fields=fields)
+            if tags_changed:
+                writer.save_tags(recipe, recipe_tags)
+            if ingredients_changed:
+                writer.save_ingredients(recipe, [
+                    {'id': ingredient_id, 'amount': amount}
+                    for ingredient_id, amount in amounts.items()
+                ])
+        return created, updated, diff
+
+
+class ImportCommand(BaseCommand):
+    importer_class = None
+    default_filename = None
+
+    def add_arguments(self, parser):
+        if self.default_filename is None:
+            parser.add_argument('filename', type=str)
+        else:
+            parser.add_argument('filename', default=self.default_filename,
+                                nargs='?', type=str)
+        parser.add_argument('--format', choices=sorted(READERS))
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def get_format(self, options):
+        if options['format']:
+            return options['format']
+        extension = os.path.splitext(options['filename'])[1].lower()
+        if extension not in FORMATS:
+            raise CommandError(
+                f'Не удалось определить формат файла {options["filename"]}'
+            )
+        return FORMATS[extension]
+
+    def read_rows(self, file, file_format, importer):
+        if file_format == 'csv' and not importer.csv_fields:
+            raise CommandError('Этот тип данных не поддерживает CSV')
+        for number, row in enumerate(
+            READERS[file_format](file, importer.csv_fields), 1
+        ):
+            try:
+                yield importer.clean(row)
+            except (KeyError, TypeError, ValueError) as error:
+                importer.skipped += 1
+                self.stderr.write(f'Строка {number} пропущена: {error!r}')
+
+    def handle(self, *args, **options):
+        importer = self.importer_class(dry_run=options['dry_run'])
+        file_format = self.get_format(options)
+        path = os.path.join(DATA_ROOT, options['filename'])
+        processed = created = updated = 0
+        started = time.monotonic()
+        try:
+            with open(path, newline='', encoding='utf8') as file:
+                for rows in chunked(
+                    self.read_rows(file, file_format, importer),
+                    options['chunk_size']
+                ):
+                    with transaction.atomic():
+                        chunk_created, chunk_updated, diff = (
+                            importer.import_chunk(rows)
+                        )
+                    processed += len(rows)
+                    created += chunk_created
+                    updated += chunk_updated
+                    if options['dry_run'] or options['verbosity'] > 1:
+                        for line in diff:
+                            self.stdout.write(line)
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(
+                        f'Обработано {processed}: создано {created}, '
+                        f'обновлено {updated}, пропущено {importer.skipped} '
+                        f'({processed / elapsed:.0f} строк/с)'
+                    )
+        except FileNotFoundError:
+            raise CommandError(f'Файл {options["filename"]} не найден')
+        except (ValueError, IntegrityError) as error:
+            raise CommandError(f'Ошибка импорта: {error}')
+        if not options['dry_run']:
+            importer.finish()
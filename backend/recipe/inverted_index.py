@@ -0,0 +1,181 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Exists, OuterRef
+
+from foodgram.db.routers import PRIMARY_DATABASE
+from recipe.models import IngredientRecipe
+from recipe.versions import StoredVersion
+
+EMPTY = array('I')
+
+
+def contains(postings, recipe_id):
+    position = bisect_left(postings, recipe_id)
+    return position < len(postings) and postings[position] == recipe_id
+
+
+def add_recipe(postings, recipe_id):
+    position = bisect_left(postings, recipe_id)
+    if position < len(postings) and postings[position] == recipe_id:
+        return postings
+    return postings[:position] + array('I', [recipe_id]) + postings[position:]
+
+
+def remove_recipe(postings, recipe_id):
+    position = bisect_left(postings, recipe_id)
+    if position == len(postings) or postings[position] != recipe_id:
+        return postings
+    return postings[:position] + postings[position + 1:]
+
+
+def intersect(postings):
+    smallest, *others = sorted(postings, key=len)
+    return [
+        recipe_id for recipe_id in smallest
+        if all(contains(other, recipe_id) for other in others)
+    ]
+
+
+def has_ingredients(ingredient_ids):
+    return Exists(IngredientRecipe.objects.filter(
+        recipe=OuterRef('pk'), ingredient_id__in=ingredient_ids
+    ))
+
+
+def filter_in_database(queryset, included, excluded):
+    for ingredient_id in included:
+        queryset = queryset.filter(has_ingredients([ingredient_id]))
+    if excluded:
+        queryset = queryset.exclude(has_ingredients(excluded))
+    return queryset
+
+
+class RecipeIngredientIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = None
+        self.version = None
+        self.built_at = None
+        self.rebuilding = False
+        self.stored_version = StoredVersion('recipe-ingredients')
+
+    def is_stale(self, version):
+        return (
+            self.version != version
+            or time.monotonic() - self.built_at
+            > settings.RECIPE_INGREDIENT_INDEX_TTL
+        )
+
+    def build(self):
+        postings = defaultdict(partial(array, 'I'))
+        for ingredient_id, recipe_id in (
+            IngredientRecipe.objects
+            .using(PRIMARY_DATABASE)
+            .values_list('ingredient_id', 'recipe_id')
+            .order_by()
+            .iterator()
+        ):
+            postings[ingredient_id].append(recipe_id)
+        return {
+            ingredient_id: array('I', sorted(recipe_ids))
+            for ingredient_id, recipe_ids in postings.items()
+        }
+
+    def refresh(self):
+        if self.built_at is None or self.is_stale(self.stored_version.get()):
+            self.start_rebuild()
+
+    def start_rebuild(self):
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        threading.Thread(
+            target=self.rebuild, name='recipe-ingredient-index', daemon=True
+        ).start()
+
+    def rebuild(self):
+        try:
+            version = self.stored_version.get()
+            postings = self.build()
+            with self.lock:
+                self.postings = postings
+                self.version = version
+                self.built_at = time.monotonic()
+        finally:
+            self.rebuilding = False
+            connections.close_all()
+
+    def change(self, update):
+        with self.lock:
+            if self.postings is not None:
+                postings = dict(self.postings)
+                update(postings)
+                self.postings = postings
+        self.stored_version.bump()
+
+    def update_recipe(self, recipe_id, added, removed):
+        def update(postings):
+            for ingredient_id in added:
+                postings[ingredient_id] = add_recipe(
+                    postings.get(ingredient_id, EMPTY), recipe_id
+                )
+            for ingredient_id in removed:
+                postings[ingredient_id] = remove_recipe(
+                    postings.get(ingredient_id, EMPTY), recipe_id
+                )
+
+        self.change(update)
+
+    def delete_recipe(self, recipe_id):
+        def update(postings):
+            for ingredient_id, recipe_ids in list(postings.items()):
+                if contains(recipe_ids, recipe_id):
+                    postings[ingredient_id] = remove_recipe(
+                        recipe_ids, recipe_id
+                    )
+
+        self.change(update)
+
+    def filter(self, queryset, included, excluded):
+        self.refresh()
+        postings = self.postings
+        if postings is None:
+            return filter_in_database(queryset, included, excluded)
+        limit = settings.RECIPE_INGREDIENT_INDEX_MAX_IDS
+        if included:
+            included_postings = [
+                postings.get(ingredient_id, EMPTY)
+                for ingredient_id in included
+            ]
+            if min(map(len, included_postings)) > limit:
+                return filter_in_database(queryset, included, excluded)
+            excluded_postings = [
+                postings.get(ingredient_id, EMPTY)
+                for ingredient_id in excluded
+            ]
+            return queryset.filter(id__in=[
+                recipe_id for recipe_id in intersect(included_postings)
+                if not any(
+                    contains(recipe_ids, recipe_id)
+                    for recipe_ids in excluded_postings
+                )
+            ])
+        if not excluded:
+            return queryset
+        excluded_ids = set()
+        for ingredient_id in excluded:
+            excluded_ids.update(postings.get(ingredient_id, EMPTY))
+            if len(excluded_ids) > limit:
+                return queryset.exclude(has_ingredients(excluded))
+        return queryset.exclude(id__in=excluded_ids)
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
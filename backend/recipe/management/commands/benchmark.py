@@ -0,0 +1,306 @@
+import json
+import math
+import platform
+import resource
+import subprocess
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipe.models import (FavoriteRecipe, IngredientRecipe, Recipe,
+                           ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def get_process_rss(pid):
+    pids = [pid]
+    total = 0
+    while pids:
+        pid = pids.pop()
+        try:
+            with open(f'/proc/{pid}/status', encoding='utf8') as file:
+                for line in file:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+            with open(
+                f'/proc/{pid}/task/{pid}/children', encoding='utf8'
+            ) as file:
+                pids.extend(int(child) for child in file.read().split())
+        except OSError:
+            continue
+    return total
+
+
+def get_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', 'HEAD'),
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Замер задержек, числа запросов и памяти для эндпоинтов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--user', type=str,
+                            help='Email пользователя для запросов')
+        parser.add_argument('--endpoint', action='append',
+                            help='Запустить только указанные эндпоинты')
+        parser.add_argument('--output', type=str,
+                            help='Сохранить результаты в JSON-файл')
+        parser.add_argument('--compare', type=str,
+                            help='Сравнить с предыдущим результатом')
+        parser.add_argument('--base-url', type=str,
+                            help='Нагружать запущенный сервер по HTTP')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Число одновременных HTTP-запросов')
+        parser.add_argument('--server-pid', type=int,
+                            help='PID сервера для замера занятой памяти')
+
+    def get_user(self, email):
+        users = User.objects.order_by('id')
+        if email:
+            users = users.filter(email=email)
+        user = users.first()
+        if user is None:
+            raise CommandError('Нет пользователя для запросов')
+        return user
+
+    def get_endpoints(self):
+        recipe = Recipe.objects.order_by('-pub_date', '-id').first()
+        tag = Tag.objects.order_by('id').first()
+        ingredient = IngredientRecipe.objects.select_related(
+            'ingredient'
+        ).order_by('id').first()
+        endpoints = {
+            'tags': ('/api/tags/', False),
+            'ingredients_search': (
+                f'/api/ingredients/?name='
+                f'{ingredient.ingredient.name[:3] if ingredient else "а"}',
+                False
+            ),
+            'recipes_anonymous': ('/api/recipes/', False),
+            'recipes': ('/api/recipes/', True),
+            'recipes_cursor': ('/api/recipes/?pagination=cursor', True),
+            'recipes_favorited': ('/api/recipes/?is_favorited=1', True),
+            'recipes_search': ('/api/recipes/?search=суп', True),
+            'feed': ('/api/recipes/feed/', True),
+            'subscriptions': (
+                '/api/users/subscriptions/?recipes_limit=3', True
+            ),
+            'shopping_cart_summary': (
+                '/api/recipes/shopping_cart/summary/', True
+            ),
+            'download_shopping_cart': (
+                '/api/recipes/download_shopping_cart/', True
+            ),
+        }
+        if recipe is not None:
+            endpoints['recipe_detail'] = (f'/api/recipes/{recipe.id}/', True)
+        if tag is not None:
+            endpoints['recipes_tag'] = (f'/api/recipes/?tags={tag.slug}', True)
+        if ingredient is not None:
+            endpoints['recipes_ingredient'] = (
+                f'/api/recipes/?ingredients={ingredient.ingredient_id}', True
+            )
+        return endpoints
+
+    def request(self, client, path):
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def profile(self, client, path):
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.request(client, path)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return response.status_code, len(queries), peak
+
+    def measure(self, client, path, iterations, warmup):
+        for _ in range(warmup):
+            self.request(client, path)
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            self.request(client, path)
+            timings.append((time.perf_counter() - started) * 1000)
+        status, queries, peak = self.profile(client, path)
+        return {
+            'path': path,
+            'status': status,
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': queries,
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def fetch(self, url, token):
+        request = urllib.request.Request(url)
+        if token is not None:
+            request.add_header('Authorization', f'Token {token}')
+        started = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            return response.status, (time.perf_counter() - started) * 1000
+
+    def measure_http(self, url, token, iterations, warmup, concurrency):
+        for _ in range(warmup):
+            self.fetch(url, token)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.perf_counter()
+            responses = list(executor.map(
+                lambda _: self.fetch(url, token), range(iterations)
+            ))
+            elapsed = time.perf_counter() - started
+        timings = [timing for _, timing in responses]
+        return {
+            'path': url,
+            'status': responses[-1][0],
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'requests_per_second': round(iterations / elapsed, 1),
+        }
+
+    def report(self, name, result):
+        line = (
+            f'{name}: p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс'
+        )
+        if 'requests_per_second' in result:
+            line += f', {result["requests_per_second"]} запросов/с'
+        else:
+            line += (
+                f', запросов {result["queries"]}, '
+                f'память {result["peak_memory_kb"]} КБ'
+            )
+        self.stdout.write(line)
+
+    def compare(self, results, path):
+        with open(path, encoding='utf8') as file:
+            previous = json.load(file)['endpoints']
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            change = (
+                (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+                if before['p95_ms'] else 0
+            )
+            line = (
+                f'{name}: p95 {before["p95_ms"]} -> {result["p95_ms"]} мс '
+                f'({change:+.1f}%)'
+            )
+            for key, label in (
+                ('queries', 'запросов'),
+                ('requests_per_second', 'запросов/с'),
+            ):
+                if key in result and key in before:
+                    line += f', {label} {before[key]} -> {result[key]}'
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('Нужна хотя бы одна итерация')
+        if options['concurrency'] < 1:
+            raise CommandError('Нужен хотя бы один одновременный запрос')
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        anonymous = APIClient()
+        authorized = APIClient()
+        authorized.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        endpoints = self.get_endpoints()
+        if options['endpoint']:
+            unknown = set(options['endpoint']) - endpoints.keys()
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}'
+                )
+            endpoints = {
+                name: endpoints[name] for name in options['endpoint']
+            }
+        results = {}
+        if options['base_url']:
+            base_url = options['base_url'].rstrip('/')
+            for name, (path, authenticated) in endpoints.items():
+                results[name] = self.measure_http(
+                    base_url + path,
+                    token.key if authenticated else None,
+                    options['iterations'],
+                    options['warmup'],
+                    options['concurrency']
+                )
+                self.report(name, results[name])
+        else:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+            ):
+                for name, (path, authenticated) in endpoints.items():
+                    results[name] = self.measure(
+                        authorized if authenticated else anonymous,
+                        path,
+                        options['iterations'],
+                        options['warmup']
+                    )
+                    self.report(name, results[name])
+        report = {
+            'revision': get_revision(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'base_url': options['base_url'],
+            'concurrency': options['concurrency'],
+            'user': user.email,
+            'dataset': {
+                model._meta.label: model.objects.count()
+                for model in (
+                    User, Recipe, IngredientRecipe, FavoriteRecipe,
+                    ShoppingCart, Follow
+                )
+            },
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'server_rss_kb': (
+                get_process_rss(options['server_pid'])
+                if options['server_pid'] else None
+            ),
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
+        else:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        if options['compare']:
+            self.compare(results, options['compare'])
@@ -0,0 +1,117 @@
+import json
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from api.renderers import FastJSONRenderer, iter_json, orjson
+from api.serializers import IngredientSerializer
+from recipe.models import Ingredients
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from users.models import User
+
+PAYLOADS = {
+    'recipes_100': '/api/recipes/?limit=100',
+    'recipes_500': '/api/recipes/?limit=500',
+    'subscriptions_50': '/api/users/subscriptions/?limit=50&recipes_limit=3',
+    'users_500': '/api/users/?limit=500',
+}
+
+
+class Command(BaseCommand):
+    help = 'Сравнение JSONRenderer и FastJSONRenderer на реальных данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--user', type=str,
+                            help='Email пользователя для запросов')
+        parser.add_argument('--output', type=str,
+                            help='Сохранить результаты в JSON')
+
+    def get_payloads(self, email):
+        users = User.objects.order_by('id')
+        if email:
+            users = users.filter(email=email)
+        user = users.first()
+        if user is None:
+            raise CommandError('Нет пользователя для запросов')
+        client = APIClient()
+        client.force_authenticate(user)
+        payloads = {
+            'ingredients': IngredientSerializer(
+                Ingredients.objects.all(), many=True
+            ).data,
+        }
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            JSON_STREAM_MIN_ITEMS=float('inf')
+        ):
+            for name, path in PAYLOADS.items():
+                response = client.get(path)
+                if response.status_code != 200:
+                    raise CommandError(
+                        f'{path}: статус {response.status_code}'
+                    )
+                payloads[name] = response.data
+        return payloads
+
+    def consume_stream(self, data):
+        for _ in iter_json(data, settings.JSON_STREAM_CHUNK_SIZE):
+            pass
+
+    def measure(self, render, data, iterations):
+        render(data)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            render(data)
+        elapsed = (time.perf_counter() - started) / iterations * 1000
+        tracemalloc.start()
+        try:
+            render(data)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return round(elapsed, 3), round(peak / 1024, 1)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('Нужна хотя бы одна итерация')
+        if orjson is None:
+            self.stderr.write(
+                'orjson не установлен, FastJSONRenderer использует json'
+            )
+        payloads = self.get_payloads(options['user'])
+        renderers = {
+            'json': JSONRenderer().render,
+            'fast': FastJSONRenderer().render,
+            'stream': self.consume_stream,
+        }
+        results = {}
+        for name, data in payloads.items():
+            body = JSONRenderer().render(data)
+            if FastJSONRenderer().render(data) != body or b''.join(
+                iter_json(data, settings.JSON_STREAM_CHUNK_SIZE)
+            ) != body:
+                raise CommandError(f'{name}: ответ отличается от JSONRenderer')
+            result = results[name] = {'size_kb': round(len(body) / 1024, 1)}
+            for renderer, render in renderers.items():
+                result[f'{renderer}_ms'], result[f'{renderer}_kb'] = (
+                    self.measure(render, data, options['iterations'])
+                )
+            result['speedup'] = round(
+                result['json_ms'] / result['fast_ms'], 1
+            ) if result['fast_ms'] else None
+            self.stdout.write(
+                f'{name} ({result["size_kb"]} КБ): '
+                f'json {result["json_ms"]} мс / {result["json_kb"]} КБ, '
+                f'fast {result["fast_ms"]} мс / {result["fast_kb"]} КБ, '
+                f'stream {result["stream_ms"]} мс / '
+                f'{result["stream_kb"]} КБ, '
+                f'ускорение x{result["speedup"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
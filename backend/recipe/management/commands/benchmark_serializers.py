@@ -0,0 +1,143 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from django.test import override_settings
+
+from api.fast_serializers import build_recipe_fragments, build_subscriptions
+from api.recipe_cache import apply_overlay
+from api.serializers import RecipeGetSerializer, SubscriptionsSerializer
+from api.views import FollowViewSet, RecipeViewSet
+from recipe.models import IngredientRecipe
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение сериализаторов и быстрого пути чтения на values(): '
+        'совпадение ответов и скорость'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--recipes-limit', type=int, default=3)
+        parser.add_argument('--user', type=str,
+                            help='Email пользователя для запросов')
+        parser.add_argument('--output', type=str,
+                            help='Сохранить результаты в JSON')
+
+    def get_request(self, email, recipes_limit):
+        users = User.objects.order_by('id')
+        if email:
+            users = users.filter(email=email)
+        user = users.first()
+        if user is None:
+            raise CommandError('Нет пользователя для запросов')
+        request = Request(APIRequestFactory().get(
+            '/', {'recipes_limit': recipes_limit}
+        ))
+        request.user = user
+        return request
+
+    def get_view(self, view_class, request):
+        return view_class(request=request, format_kwarg=None, action='list')
+
+    def get_recipe_payloads(self, request, limit):
+        view = self.get_view(RecipeViewSet, request)
+        queryset = view.get_queryset().order_by('-pub_date', '-id')[:limit]
+
+        def legacy():
+            recipes = queryset.prefetch_related(
+                'author',
+                'tags',
+                Prefetch(
+                    'ingredientrecipes',
+                    queryset=IngredientRecipe.objects.select_related(
+                        'ingredient'
+                    )
+                )
+            )
+            return RecipeGetSerializer(
+                recipes, many=True, context={'request': request}
+            ).data
+
+        def fast():
+            rows = list(view.get_rows(queryset))
+            fragments = build_recipe_fragments([row['id'] for row in rows])
+            return [
+                apply_overlay(fragments[row['id']], row, request)
+                for row in rows
+            ]
+
+        return legacy, fast
+
+    def get_subscription_payloads(self, request, limit, recipes_limit):
+        view = self.get_view(FollowViewSet, request)
+        queryset = view.get_queryset().order_by('-add_date', '-id')[:limit]
+
+        def legacy():
+            return SubscriptionsSerializer(
+                queryset, many=True, context={'request': request}
+            ).data
+
+        def fast():
+            return build_subscriptions(
+                list(view.get_rows(queryset)), recipes_limit
+            )
+
+        return legacy, fast
+
+    def measure(self, build, iterations):
+        build()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            JSONRenderer().render(build())
+        return round((time.perf_counter() - started) / iterations * 1000, 3)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['limit'] < 1:
+            raise CommandError('Нужны положительные iterations и limit')
+        request = self.get_request(options['user'], options['recipes_limit'])
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            payloads = {
+                'recipes': self.get_recipe_payloads(
+                    request, options['limit']
+                ),
+                'subscriptions': self.get_subscription_payloads(
+                    request, options['limit'], options['recipes_limit']
+                ),
+            }
+            for name, (legacy, fast) in payloads.items():
+                body = JSONRenderer().render(legacy())
+                if JSONRenderer().render(fast()) != body:
+                    raise CommandError(
+                        f'{name}: ответ отличается от сериализатора'
+                    )
+                result = results[name] = {
+                    'size_kb': round(len(body) / 1024, 1),
+                    'serializer_ms': self.measure(
+                        legacy, options['iterations']
+                    ),
+                    'values_ms': self.measure(fast, options['iterations']),
+                }
+                result['speedup'] = round(
+                    result['serializer_ms'] / result['values_ms'], 1
+                ) if result['values_ms'] else None
+                self.stdout.write(
+                    f'{name} ({result["size_kb"]} КБ): '
+                    f'сериализатор {result["serializer_ms"]} мс, '
+                    f'values() {result["values_ms"]} мс, '
+                    f'ускорение x{result["speedup"]}'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
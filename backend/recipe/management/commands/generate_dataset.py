@@ -0,0 +1,222 @@
+import random
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max, Sum
+
+from PIL import Image
+from recipe.fulltext import update_search_index
+from recipe.importers import chunked
+from recipe.models import (FavoriteRecipe, FeedEntry, IngredientRecipe,
+                           Ingredients, Recipe, ShoppingCart, ShoppingListItem,
+                           Tag, TagRecipe)
+from recipe.tag_masks import get_tags_mask, has_tag_bit
+from users.models import Follow, User
+
+DATASET_IMAGE = 'recipes/images/dataset.png'
+DATASET_PASSWORD = 'dataset-password'
+
+
+class Command(BaseCommand):
+    help = 'Генерация воспроизводимого набора данных для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=10)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def get_next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def insert(self, model, objects):
+        started = time.monotonic()
+        count = 0
+        for batch in chunked(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+            count += len(batch)
+        self.stdout.write(
+            f'{model._meta.label}: {count} '
+            f'({time.monotonic() - started:.1f} с)'
+        )
+
+    def create_image(self):
+        if not default_storage.exists(DATASET_IMAGE):
+            buffer = BytesIO()
+            Image.new('RGB', (600, 400), (226, 108, 45)).save(buffer, 'PNG')
+            default_storage.save(DATASET_IMAGE, ContentFile(buffer.getvalue()))
+
+    def generate_users(self, count):
+        first_id = self.get_next_id(User)
+        password = make_password(DATASET_PASSWORD)
+        self.insert(User, (
+            User(
+                id=user_id,
+                username=f'user{user_id}',
+                email=f'user{user_id}@example.com',
+                first_name=f'Имя{user_id}',
+                last_name=f'Фамилия{user_id}',
+                password=password
+            )
+            for user_id in range(first_id, first_id + count)
+        ))
+        return range(first_id, first_id + count)
+
+    def generate_recipes(self, count, user_ids, ingredient_names, tag_ids):
+        first_id = self.get_next_id(Recipe)
+        recipe_ids = range(first_id, first_id + count)
+        authors = [self.random.choice(user_ids) for _ in recipe_ids]
+        tags = [
+            self.random.sample(
+                tag_ids, self.random.randint(1, min(3, len(tag_ids)))
+            )
+            for _ in recipe_ids
+        ]
+        names = list(ingredient_names.values())
+        ingredient_ids = list(ingredient_names)
+
+        def recipe(index, recipe_id):
+            main, side = self.random.sample(names, 2)
+            return Recipe(
+                id=recipe_id,
+                author_id=authors[index],
+                name=f'{main.capitalize()} с {side}'[:200],
+                text=' '.join(self.random.sample(names, 20)),
+                cooking_time=self.random.randint(5, 180),
+                image=DATASET_IMAGE,
+                tags_mask=get_tags_mask(
+                    tag_id for tag_id in tags[index] if has_tag_bit(tag_id)
+                )
+            )
+
+        self.insert(Recipe, (
+            recipe(index, recipe_id)
+            for index, recipe_id in enumerate(recipe_ids)
+        ))
+        self.insert(TagRecipe, (
+            TagRecipe(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id, recipe_tags in zip(recipe_ids, tags)
+            for tag_id in recipe_tags
+        ))
+        self.insert(IngredientRecipe, (
+            IngredientRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.random.randint(1, 500)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.random.sample(
+                ingredient_ids, self.ingredients_per_recipe
+            )
+        ))
+        return recipe_ids
+
+    def generate_relations(self, model, field, user_ids, related_ids,
+                           per_user, skip_self=False):
+        per_user = min(per_user, len(related_ids))
+        self.insert(model, (
+            model(user_id=user_id, **{f'{field}_id': related_id})
+            for user_id in user_ids
+            for related_id in self.random.sample(related_ids, per_user)
+            if not skip_self or related_id != user_id
+        ))
+
+    def generate_feeds(self, recipe_ids):
+        recipes = {}
+        for recipe_id, author_id, pub_date in Recipe.objects.filter(
+            id__in=recipe_ids
+        ).order_by('id').values_list('id', 'author_id', 'pub_date'):
+            recipes.setdefault(author_id, []).append((recipe_id, pub_date))
+        fanout_authors = set(
+            User.objects.filter(
+                id__in=recipes,
+                followers_count__lte=settings.FEED_FANOUT_LIMIT
+            ).values_list('id', flat=True)
+        )
+        self.insert(FeedEntry, (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+            for user_id, author_id in Follow.objects.filter(
+                author_id__in=fanout_authors
+            ).values_list('user_id', 'author_id').iterator()
+            for recipe_id, pub_date in recipes[author_id][
+                -settings.FEED_BACKFILL_SIZE:
+            ]
+        ))
+
+    def generate_shopping_lists(self, user_ids):
+        self.insert(ShoppingListItem, (
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total
+            )
+            for batch in chunked(user_ids, self.batch_size)
+            for user_id, ingredient_id, total in (
+                IngredientRecipe.objects
+                .filter(recipe__shopping_carts__user__in=batch)
+                .values_list('recipe__shopping_carts__user', 'ingredient')
+                .annotate(total=Sum('amount'))
+                .order_by()
+            )
+        ))
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(no_style(), [
+            User, Recipe, TagRecipe, IngredientRecipe, FavoriteRecipe,
+            ShoppingCart, ShoppingListItem, Follow, FeedEntry
+        ])
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.ingredients_per_recipe = options['ingredients_per_recipe']
+        if not Ingredients.objects.exists():
+            call_command('import_ingredients', stdout=self.stdout)
+        ingredient_names = dict(
+            Ingredients.objects.order_by('id').values_list('id', 'name')
+        )
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        if not tag_ids:
+            raise CommandError('Сначала загрузите теги: manage.py import_tags')
+        if self.ingredients_per_recipe > len(ingredient_names):
+            raise CommandError('Ингредиентов в каталоге меньше, чем нужно')
+        self.create_image()
+        user_ids = self.generate_users(options['users'])
+        recipe_ids = self.generate_recipes(
+            options['recipes'], user_ids, ingredient_names, tag_ids
+        )
+        self.generate_relations(
+            FavoriteRecipe, 'recipe', user_ids, recipe_ids,
+            options['favorites_per_user']
+        )
+        self.generate_relations(
+            ShoppingCart, 'recipe', user_ids, recipe_ids,
+            options['cart_per_user']
+        )
+        self.generate_relations(
+            Follow, 'author', user_ids, user_ids,
+            options['follows_per_user'], skip_self=True
+        )
+        self.reset_sequences()
+        call_command('reconcile_counters', batch_size=self.batch_size,
+                     stdout=self.stdout)
+        self.generate_feeds(recipe_ids)
+        for batch in chunked(recipe_ids, self.batch_size):
+            update_search_index(batch)
+        self.generate_shopping_lists(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: пароль пользователей {DATASET_PASSWORD}'
+        ))
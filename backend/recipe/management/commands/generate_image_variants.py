@@ -0,0 +1,59 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from recipe.images import (needs_image_variants, render_image_variants,
+                           store_image_variants)
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных и WebP-вариантов изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=os.cpu_count())
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать уже готовые варианты')
+
+    def read_image(self, recipe):
+        with recipe.image.open('rb') as image_file:
+            return image_file.read()
+
+    def handle(self, *args, **options):
+        recipes = [
+            recipe for recipe in Recipe.objects.exclude(image='').only(
+                'id', 'image', 'image_variants'
+            ).iterator()
+            if options['force'] or needs_image_variants(recipe)
+        ]
+        processed = failed = 0
+        with ProcessPoolExecutor(options['processes']) as pool:
+            for start in range(0, len(recipes), options['batch_size']):
+                batch = recipes[start:start + options['batch_size']]
+                futures = []
+                for recipe in batch:
+                    try:
+                        data = self.read_image(recipe)
+                    except OSError as error:
+                        failed += 1
+                        self.stderr.write(f'{recipe.image.name}: {error}')
+                        continue
+                    futures.append(
+                        (recipe, pool.submit(render_image_variants, data))
+                    )
+                for recipe, future in futures:
+                    try:
+                        store_image_variants(recipe, future.result())
+                        processed += 1
+                    except Exception as error:
+                        failed += 1
+                        self.stderr.write(f'{recipe.image.name}: {error}')
+                self.stdout.write(
+                    f'Обработано {processed + failed} из {len(recipes)}'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {processed}, ошибок: {failed}'
+        ))
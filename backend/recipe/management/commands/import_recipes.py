@@ -0,0 +1,6 @@
+from recipe.importers import ImportCommand, RecipeImporter
+
+
+class Command(ImportCommand):
+    help = 'Загрузка рецептов из JSON или NDJSON'
+    importer_class = RecipeImporter
@@ -0,0 +1,6 @@
+from recipe.importers import ImportCommand, TagImporter
+
+
+class Command(ImportCommand):
+    help = 'Загрузка тегов из CSV, JSON или NDJSON'
+    importer_class = TagImporter
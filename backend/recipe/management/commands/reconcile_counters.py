@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from recipe.counters import COUNTERS, count_subquery
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков избранного, покупок, рецептов и подписчиков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def reconcile(self, model, field, source_model, related_field,
+                  batch_size):
+        fixed = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                model.objects
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .annotate(
+                    actual=count_subquery(source_model, related_field)
+                )
+                .values_list('pk', field, 'actual')[:batch_size]
+            )
+            if not rows:
+                return fixed
+            drifted = [
+                model(pk=pk, **{field: actual})
+                for pk, stored, actual in rows if stored != actual
+            ]
+            model.objects.bulk_update(drifted, [field])
+            fixed += len(drifted)
+            last_pk = rows[-1][0]
+
+    def handle(self, *args, **options):
+        for model, field, source_model, related_field in COUNTERS:
+            fixed = self.reconcile(
+                model, field, source_model, related_field,
+                options['batch_size']
+            )
+            self.stdout.write(
+                f'{model._meta.label}.{field}: исправлено {fixed}'
+            )
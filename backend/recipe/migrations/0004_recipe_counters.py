@@ -0,0 +1,58 @@
+# Generated by Django 3.2.18 on 2026-10-18 18:56
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, related_field):
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{related_field: OuterRef('pk')})
+            .order_by()
+            .values(related_field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    FavoriteRecipe = apps.get_model('recipe', 'FavoriteRecipe')
+    ShoppingCart = apps.get_model('recipe', 'ShoppingCart')
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    Recipe.objects.update(
+        favorites_count=count_subquery(FavoriteRecipe, 'recipe'),
+        cart_count=count_subquery(ShoppingCart, 'recipe'),
+    )
+    User.objects.update(
+        recipes_count=count_subquery(Recipe, 'author'),
+        followers_count=count_subquery(Follow, 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0003_recipe_image_variants'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
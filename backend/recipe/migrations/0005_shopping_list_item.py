@@ -0,0 +1,58 @@
+# Generated by Django 3.2.18 on 2026-10-18 19:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    IngredientRecipe = apps.get_model('recipe', 'IngredientRecipe')
+    ShoppingListItem = apps.get_model('recipe', 'ShoppingListItem')
+    totals = (
+        IngredientRecipe.objects
+        .filter(recipe__shopping_carts__isnull=False)
+        .values_list('recipe__shopping_carts__user', 'ingredient')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total
+            )
+            for user_id, ingredient_id, total in totals.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0004_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, verbose_name='Кол-во')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipe.ingredients', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Позиции списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(
+            fill_shopping_lists, migrations.RunPython.noop
+        ),
+    ]
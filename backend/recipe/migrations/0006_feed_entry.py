@@ -0,0 +1,53 @@
+# Generated by Django 3.2.18 on 2026-10-18 19:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    FeedEntry = apps.get_model('recipe', 'FeedEntry')
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('recipe', 'Recipe')
+    for follow in Follow.objects.filter(
+        author__followers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).iterator():
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(user_id=follow.user_id, recipe_id=recipe_id)
+                for recipe_id in Recipe.objects.filter(
+                    author_id=follow.author_id
+                ).order_by('-pub_date', '-id').values_list(
+                    'id', flat=True
+                )[:settings.FEED_BACKFILL_SIZE]
+            ),
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0005_shopping_list_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipe.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
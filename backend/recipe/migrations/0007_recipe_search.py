@@ -0,0 +1,56 @@
+# Generated by Django 3.2.18 on 2026-10-18 19:04
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX recipe_search_vector_idx ON recipe_recipe '
+            'USING gin (search_vector)'
+        )
+        Recipe.objects.update(
+            search_vector=SearchVector(
+                'name', weight='A', config=settings.RECIPE_SEARCH_CONFIG
+            ) + SearchVector(
+                'text', weight='B', config=settings.RECIPE_SEARCH_CONFIG
+            )
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE recipe_search USING fts5('
+            "name, text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            'INSERT INTO recipe_search(rowid, name, text) '
+            'SELECT id, name, text FROM recipe_recipe'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS recipe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_feed_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.18 on 2026-10-18 19:06
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_tags_masks(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    TagRecipe = apps.get_model('recipe', 'TagRecipe')
+    masks = defaultdict(int)
+    for recipe_id, tag_id in TagRecipe.objects.values_list(
+        'recipe_id', 'tag_id'
+    ).iterator():
+        if 0 < tag_id <= 63:
+            masks[recipe_id] |= 1 << (tag_id - 1)
+    Recipe.objects.bulk_update(
+        [
+            Recipe(id=recipe_id, tags_mask=mask)
+            for recipe_id, mask in masks.items()
+        ],
+        ['tags_mask'],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска тегов'),
+        ),
+        migrations.RunPython(fill_tags_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.18 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0008_recipe_tags_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Каталог')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия каталога',
+                'verbose_name_plural': 'Версии каталогов',
+            },
+        ),
+    ]
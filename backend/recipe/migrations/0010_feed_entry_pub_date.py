@@ -0,0 +1,38 @@
+# Generated by Django 3.2.18 on 2026-10-18 21:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def fill_pub_dates(apps, schema_editor):
+    FeedEntry = apps.get_model('recipe', 'FeedEntry')
+    Recipe = apps.get_model('recipe', 'Recipe')
+    FeedEntry.objects.update(pub_date=Subquery(
+        Recipe.objects.filter(pk=OuterRef('recipe')).values('pub_date')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0009_catalogue_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedentry',
+            name='pub_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата публикации'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_pub_dates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_entry_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+    ]
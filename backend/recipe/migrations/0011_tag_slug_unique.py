@@ -0,0 +1,29 @@
+# Generated by Django 3.2.18 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+def deduplicate_slugs(apps, schema_editor):
+    Tag = apps.get_model('recipe', 'Tag')
+    seen = set()
+    for tag in Tag.objects.order_by('id'):
+        if tag.slug in seen:
+            tag.slug = f'{tag.slug}-{tag.id}'
+            tag.save(update_fields=['slug'])
+        seen.add(tag.slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0010_feed_entry_pub_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tag',
+            name='slug',
+            field=models.SlugField(max_length=200, unique=True, verbose_name='Slug'),
+        ),
+    ]
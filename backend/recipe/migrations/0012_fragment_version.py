@@ -0,0 +1,24 @@
+# Generated by Django 3.2.18 on 2026-10-19 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0011_tag_slug_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FragmentVersion',
+            fields=[
+                ('key', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия фрагмента',
+                'verbose_name_plural': 'Версии фрагментов',
+            },
+        ),
+    ]
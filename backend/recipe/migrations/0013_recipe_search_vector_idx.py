@@ -0,0 +1,22 @@
+# Generated by Django 3.2.18 on 2026-10-19 10:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0012_fragment_version'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -1,7 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
 from colorfield.fields import ColorField
+from foodgram.db.models import CounterFieldsMixin
 from users.models import User
 
 
@@ -20,6 +23,7 @@ class Tag(models.Model):
     slug = models.SlugField(
         'Slug',
         max_length=200,
+        unique=True
     )
 
     class Meta:
@@ -56,7 +60,9 @@ class Ingredients(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
+    counter_fields = ('favorites_count', 'cart_count')
+
     author = models.ForeignKey(
         User,
         related_name='recipes',
@@ -71,6 +77,12 @@ class Recipe(models.Model):
         'Изображение',
         upload_to='recipes/images/',
     )
+    image_variants = models.JSONField(
+        'Варианты изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField(
         'Описание рецепта',
     )
@@ -97,11 +109,45 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    cart_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False
+    )
+    tags_mask = models.BigIntegerField(
+        'Маска тегов',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -221,3 +267,110 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return self.recipe.name
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredients,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        'Кол-во',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return self.ingredient.name
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(
+        'Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_entry_user_pub_date_idx'
+            )
+        ]
+
+    def __str__(self):
+        return self.recipe.name
+
+
+class CatalogueVersion(models.Model):
+    name = models.CharField(
+        'Каталог',
+        max_length=50,
+        primary_key=True
+    )
+    version = models.PositiveBigIntegerField(
+        'Версия',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Версия каталога'
+        verbose_name_plural = 'Версии каталогов'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class FragmentVersion(models.Model):
+    key = models.CharField(
+        'Ключ',
+        max_length=50,
+        primary_key=True
+    )
+    version = models.PositiveBigIntegerField(
+        'Версия',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Версия фрагмента'
+        verbose_name_plural = 'Версии фрагментов'
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
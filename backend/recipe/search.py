@@ -0,0 +1,174 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+
+from foodgram.db.routers import PRIMARY_DATABASE
+from recipe.models import IngredientRecipe, Ingredients
+from recipe.versions import StoredVersion
+
+Catalogue = namedtuple(
+    'Catalogue', ('ingredients', 'names', 'ids', 'trigrams', 'sizes')
+)
+
+
+def normalize(value):
+    return value.lower().replace('ё', 'е').strip()
+
+
+def get_trigrams(value):
+    value = f'  {value} '
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.catalogue = Catalogue({}, [], [], {}, {})
+        self.popularity = {}
+        self.version = None
+        self.built_at = None
+        self.rebuilding = False
+        self.stored_version = StoredVersion('ingredients')
+
+    def invalidate(self):
+        self.stored_version.bump()
+
+    def change_popularity(self, added_ids, removed_ids):
+        with self.lock:
+            popularity = dict(self.popularity)
+            for ingredient_id in added_ids:
+                popularity[ingredient_id] = (
+                    popularity.get(ingredient_id, 0) + 1
+                )
+            for ingredient_id in removed_ids:
+                popularity[ingredient_id] = max(
+                    popularity.get(ingredient_id, 0) - 1, 0
+                )
+            self.popularity = popularity
+
+    def is_stale(self, version):
+        return (
+            self.version != version
+            or time.monotonic() - self.built_at
+            > settings.INGREDIENT_INDEX_TTL
+        )
+
+    def build_catalogue(self):
+        ingredients = {}
+        entries = []
+        index = defaultdict(set)
+        sizes = {}
+        for ingredient in Ingredients.objects.using(PRIMARY_DATABASE).values(
+            'id', 'name', 'measurement_unit'
+        ).order_by().iterator():
+            name = normalize(ingredient['name'])
+            name_trigrams = get_trigrams(name)
+            ingredients[ingredient['id']] = ingredient
+            entries.append((name, ingredient['id']))
+            sizes[ingredient['id']] = len(name_trigrams)
+            for trigram in name_trigrams:
+                index[trigram].add(ingredient['id'])
+        entries.sort()
+        return Catalogue(
+            ingredients,
+            [name for name, _ in entries],
+            [ingredient_id for _, ingredient_id in entries],
+            dict(index),
+            sizes
+        )
+
+    def build_popularity(self):
+        return dict(
+            IngredientRecipe.objects
+            .using(PRIMARY_DATABASE)
+            .values_list('ingredient')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+
+    def refresh(self):
+        if self.built_at is not None:
+            if self.is_stale(self.stored_version.get()):
+                self.start_rebuild()
+            return
+        with self.lock:
+            if self.built_at is not None:
+                return
+            version = self.stored_version.get()
+            self.catalogue = self.build_catalogue()
+            self.popularity = self.build_popularity()
+            self.version = version
+            self.built_at = time.monotonic()
+
+    def start_rebuild(self):
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        threading.Thread(
+            target=self.rebuild, name='ingredient-index', daemon=True
+        ).start()
+
+    def rebuild(self):
+        try:
+            version = self.stored_version.get()
+            catalogue = self.build_catalogue()
+            popularity = self.build_popularity()
+            with self.lock:
+                self.catalogue = catalogue
+                self.popularity = popularity
+                self.version = version
+                self.built_at = time.monotonic()
+        finally:
+            self.rebuilding = False
+            connections.close_all()
+
+    def search(self, query, limit):
+        self.refresh()
+        catalogue = self.catalogue
+        popularity = self.popularity
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+
+        def rank(ingredient_id):
+            return (
+                -popularity.get(ingredient_id, 0),
+                catalogue.ingredients[ingredient_id]['name']
+            )
+
+        start = bisect_left(catalogue.names, query)
+        end = bisect_left(catalogue.names, query + '\uffff', lo=start)
+        found = sorted(catalogue.ids[start:end], key=rank)[:limit]
+        if not found and len(query) >= 3:
+            found = self.fuzzy_search(catalogue, query, rank)[:limit]
+        return [
+            catalogue.ingredients[ingredient_id] for ingredient_id in found
+        ]
+
+    def fuzzy_search(self, catalogue, query, rank):
+        query_trigrams = get_trigrams(query)
+        shared = defaultdict(int)
+        for trigram in query_trigrams:
+            for ingredient_id in catalogue.trigrams.get(trigram, ()):
+                shared[ingredient_id] += 1
+        scores = {}
+        for ingredient_id, count in shared.items():
+            similarity = count / (
+                len(query_trigrams) + catalogue.sizes[ingredient_id] - count
+            )
+            if similarity >= settings.INGREDIENT_SEARCH_SIMILARITY:
+                scores[ingredient_id] = similarity
+        return sorted(
+            scores,
+            key=lambda ingredient_id: (-scores[ingredient_id],
+                                       rank(ingredient_id))
+        )
+
+
+ingredient_index = IngredientIndex()
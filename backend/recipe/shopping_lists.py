@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from recipe.models import IngredientRecipe, ShoppingCart, ShoppingListItem
+
+
+def change_shopping_list(user_id, recipe_id, sign):
+    amounts = dict(
+        IngredientRecipe.objects.filter(recipe_id=recipe_id).values_list(
+            'ingredient_id', 'amount'
+        )
+    )
+    if not amounts:
+        return
+    items = ShoppingListItem.objects.filter(
+        user_id=user_id, ingredient_id__in=amounts
+    )
+    if sign > 0:
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+                for ingredient_id in amounts
+            ),
+            ignore_conflicts=True
+        )
+    items.update(amount=Greatest(
+        F('amount') + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(sign * amount))
+                for ingredient_id, amount in amounts.items()
+            ),
+            default=Value(0)
+        ),
+        Value(0)
+    ))
+    if sign < 0:
+        items.filter(amount=0).delete()
+
+
+@transaction.atomic
+def refresh_shopping_lists(user_ids, ingredient_ids):
+    user_ids = set(user_ids)
+    ingredient_ids = set(ingredient_ids)
+    if not user_ids or not ingredient_ids:
+        return
+    totals = (
+        IngredientRecipe.objects
+        .filter(
+            recipe__shopping_carts__user__in=user_ids,
+            ingredient_id__in=ingredient_ids
+        )
+        .values_list('recipe__shopping_carts__user', 'ingredient')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=ingredient_ids
+    ).delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, amount=total
+        )
+        for user_id, ingredient_id, total in totals
+    )
+
+
+def refresh_recipe_shopping_lists(recipe_id, ingredient_ids):
+    refresh_shopping_lists(
+        ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+            'user_id', flat=True
+        ),
+        ingredient_ids
+    )
+
+
+def refresh_user_shopping_list(user_id, recipe_ids):
+    refresh_shopping_lists(
+        [user_id],
+        IngredientRecipe.objects.filter(recipe_id__in=recipe_ids).values_list(
+            'ingredient_id', flat=True
+        )
+    )
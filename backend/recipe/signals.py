@@ -0,0 +1,189 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import Signal, receiver
+
+from recipe.background import run_in_background
+from recipe.counters import change_counter, refresh_counters
+from recipe.feed import (add_to_feed, fan_out_recipe, refresh_feed,
+                         remove_from_feed)
+from recipe.fulltext import (SEARCH_FIELDS, delete_from_search_index,
+                             update_search_index)
+from recipe.images import needs_image_variants, schedule_image_processing
+from recipe.inverted_index import recipe_ingredient_index
+from recipe.models import (FavoriteRecipe, Ingredients, Recipe, ShoppingCart,
+                           TagRecipe)
+from recipe.search import ingredient_index
+from recipe.shopping_lists import (change_shopping_list,
+                                   refresh_recipe_shopping_lists,
+                                   refresh_user_shopping_list)
+from recipe.tag_masks import (filter_by_tags_mask, has_tag_bit,
+                              refresh_tags_masks)
+from users.models import Follow, User
+
+recipe_ingredients_changed = Signal()
+relations_bulk_changed = Signal()
+
+
+@receiver((post_save, post_delete), sender=Ingredients)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def change_ingredient_popularity(sender, added_ids, removed_ids, **kwargs):
+    if added_ids or removed_ids:
+        transaction.on_commit(partial(
+            ingredient_index.change_popularity, added_ids, removed_ids
+        ))
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    if needs_image_variants(instance):
+        transaction.on_commit(partial(schedule_image_processing, instance))
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def decrement_favorites_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def increment_cart_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'cart_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_cart_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'cart_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'followers_count', -1)
+
+
+@receiver(relations_bulk_changed)
+def refresh_relation_counters(sender, related_ids, **kwargs):
+    refresh_counters(sender, related_ids)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        change_shopping_list(instance.user_id, instance.recipe_id, 1)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    change_shopping_list(instance.user_id, instance.recipe_id, -1)
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def refresh_recipe_ingredients_shopping_lists(sender, recipe, ingredient_ids,
+                                              **kwargs):
+    refresh_recipe_shopping_lists(recipe.id, ingredient_ids)
+
+
+@receiver(relations_bulk_changed, sender=ShoppingCart)
+def refresh_bulk_shopping_list(sender, user, related_ids, **kwargs):
+    refresh_user_shopping_list(user.id, related_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def publish_recipe_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            partial(run_in_background, fan_out_recipe, instance.id)
+        )
+
+
+@receiver(post_save, sender=Follow)
+def add_author_to_feed(sender, instance, created, **kwargs):
+    if created:
+        add_to_feed(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def remove_author_from_feed(sender, instance, **kwargs):
+    remove_from_feed(instance.user_id, [instance.author_id])
+
+
+@receiver(relations_bulk_changed, sender=Follow)
+def refresh_bulk_feed(sender, user, related_ids, **kwargs):
+    refresh_feed(user.id, related_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, update_fields, **kwargs):
+    if update_fields is None or set(SEARCH_FIELDS) & set(update_fields):
+        update_search_index([instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    delete_from_search_index(instance.id)
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def update_recipe_ingredients_index(sender, recipe, added_ids, removed_ids,
+                                    **kwargs):
+    if added_ids or removed_ids:
+        transaction.on_commit(partial(
+            recipe_ingredient_index.update_recipe,
+            recipe.id, added_ids, removed_ids
+        ))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_ingredient_index(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        recipe_ingredient_index.delete_recipe, instance.id
+    ))
+
+
+@receiver((post_save, post_delete), sender=TagRecipe)
+def refresh_recipe_tags_mask(sender, instance, **kwargs):
+    refresh_tags_masks([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=TagRecipe)
+def refresh_m2m_tags_masks(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        refresh_tags_masks([instance.id])
+    elif pk_set is not None:
+        refresh_tags_masks(pk_set)
+    elif has_tag_bit(instance.id):
+        refresh_tags_masks(filter_by_tags_mask(
+            Recipe.objects.all(), [instance.id]
+        ).values_list('id', flat=True))
@@ -0,0 +1,40 @@
+from collections import defaultdict
+
+from django.db.models import F
+
+from recipe.models import Recipe, TagRecipe
+
+MAX_TAG_ID = 63
+
+
+def has_tag_bit(tag_id):
+    return 0 < tag_id <= MAX_TAG_ID
+
+
+def get_tags_mask(tag_ids):
+    mask = 0
+    for tag_id in tag_ids:
+        mask |= 1 << (tag_id - 1)
+    return mask
+
+
+def filter_by_tags_mask(queryset, tag_ids):
+    return queryset.alias(
+        tags_match=F('tags_mask').bitand(get_tags_mask(tag_ids))
+    ).filter(tags_match__gt=0)
+
+
+def refresh_tags_masks(recipe_ids):
+    tags = defaultdict(list)
+    for recipe_id, tag_id in TagRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'tag_id'):
+        if has_tag_bit(tag_id):
+            tags[recipe_id].append(tag_id)
+    Recipe.objects.bulk_update(
+        [
+            Recipe(id=recipe_id, tags_mask=get_tags_mask(tags[recipe_id]))
+            for recipe_id in set(recipe_ids)
+        ],
+        ['tags_mask']
+    )
@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from api.serializers import RecipeSerializer
+from PIL import Image
+from recipe.images import get_variant_names, process_recipe_image
+from recipe.importers import Importer, TagImporter
+from recipe.models import FavoriteRecipe, Recipe, Tag
+from users.models import User
+
+
+class CounterFieldsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='pass12345', first_name='Анна', last_name='Автор'
+        )
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            password='pass12345', first_name='Иван', last_name='Читатель'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Борщ', text='Описание',
+            cooking_time=60, image='recipes/images/borsch.png'
+        )
+
+    def test_recipe_edit_keeps_concurrent_favorite(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipe)
+        serializer = RecipeSerializer(
+            recipe, data={'name': 'Щи'}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Щи')
+        self.assertEqual(recipe.favorites_count, 1)
+
+    def test_stale_user_save_keeps_counters(self):
+        author = User.objects.get(pk=self.author.pk)
+        Recipe.objects.create(
+            author=self.author, name='Щи', text='Описание',
+            cooking_time=40, image='recipes/images/shchi.png'
+        )
+        author.first_name = 'Мария'
+        author.save()
+        author.refresh_from_db()
+        self.assertEqual(author.first_name, 'Мария')
+        self.assertEqual(author.recipes_count, 2)
+
+
+class TagImporterTest(TestCase):
+    def test_importer_requires_clean(self):
+        with self.assertRaises(TypeError):
+            Importer()
+
+    def test_upsert_by_slug(self):
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+        importer = TagImporter()
+        created, updated, _ = importer.import_chunk([
+            importer.clean(
+                {'name': 'Утро', 'color': '#e26c2d', 'slug': 'breakfast'}
+            ),
+            importer.clean(
+                {'name': 'Обед', 'color': '#49b64e', 'slug': 'lunch'}
+            ),
+        ])
+        self.assertEqual((created, updated), (1, 1))
+        self.assertEqual(
+            list(Tag.objects.values_list('slug', 'name').order_by('slug')),
+            [('breakfast', 'Утро'), ('lunch', 'Обед')]
+        )
+
+
+class ImageVariantsTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def save_image(self, name, color):
+        buffer = BytesIO()
+        Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+        return default_storage.save(
+            f'recipes/images/{name}.png', ContentFile(buffer.getvalue())
+        )
+
+    def get_variants(self, recipe):
+        recipe.refresh_from_db()
+        return get_variant_names(recipe.image_variants)
+
+    def test_replaced_image_removes_old_variants(self):
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='pass12345', first_name='Анна', last_name='Автор'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='Борщ', text='Описание', cooking_time=60,
+            image=self.save_image('borsch', 'red')
+        )
+        process_recipe_image(recipe.id)
+        old_variants = self.get_variants(recipe)
+        recipe.image = self.save_image('borsch', 'blue')
+        recipe.save()
+        process_recipe_image(recipe.id)
+        new_variants = self.get_variants(recipe)
+        self.assertTrue(old_variants)
+        self.assertFalse(old_variants & new_variants)
+        self.assertFalse(any(map(default_storage.exists, old_variants)))
+        self.assertTrue(all(map(default_storage.exists, new_variants)))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+from foodgram.db.routers import PRIMARY_DATABASE
+from recipe.models import CatalogueVersion
+
+
+class StoredVersion:
+    def __init__(self, name):
+        self.name = name
+        self.version = None
+        self.checked_at = None
+
+    def bump(self):
+        CatalogueVersion.objects.bulk_create(
+            [CatalogueVersion(name=self.name)], ignore_conflicts=True
+        )
+        CatalogueVersion.objects.filter(name=self.name).update(
+            version=F('version') + 1
+        )
+        self.checked_at = None
+
+    def get(self):
+        now = time.monotonic()
+        if (
+            self.checked_at is None
+            or now - self.checked_at
+            > settings.CATALOGUE_VERSION_CHECK_INTERVAL
+        ):
+            self.version = (
+                CatalogueVersion.objects
+                .using(PRIMARY_DATABASE)
+                .filter(name=self.name)
+                .values_list('version', flat=True)
+                .first()
+            ) or 0
+            self.checked_at = now
+        return self.version
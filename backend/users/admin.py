@@ -9,7 +9,9 @@ class UserAdmin(admin.ModelAdmin):
         'email',
         'first_name',
         'last_name',
-        'is_staff'
+        'is_staff',
+        'recipes_count',
+        'followers_count'
     )
     search_fields = (
         'username',
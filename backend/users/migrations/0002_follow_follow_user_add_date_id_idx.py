@@ -0,0 +1,17 @@
+# Generated by Django 3.2.18 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['user', '-add_date', '-id'], name='follow_user_add_date_id_idx'),
+        ),
+    ]
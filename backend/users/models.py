@@ -2,8 +2,12 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
 
+from foodgram.db.models import CounterFieldsMixin
+
+
+class User(CounterFieldsMixin, AbstractUser):
+    counter_fields = ('recipes_count', 'followers_count')
 
-class User(AbstractUser):
     username = models.CharField(
         'Юзернейм',
         max_length=150,
@@ -36,6 +40,16 @@ class User(AbstractUser):
         'Админ',
         default=False
     )
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'password', 'first_name', 'last_name')
@@ -68,6 +82,12 @@ class Follow(models.Model):
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ['-add_date']
+        indexes = [
+            models.Index(
+                fields=['user', '-add_date', '-id'],
+                name='follow_user_add_date_id_idx'
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'],